@@ -1,11 +1,11 @@
 import asyncio
 import websockets
-import json
+import orjson
 import logging
-import gzip
 import base64
 import time
 from aiohttp import web
+from utils.codec import encode_message, decode_message
 
 class SuppressBadRequestFilter(logging.Filter):
     def filter(self, record):
@@ -80,7 +80,7 @@ async def notify_peers(new_peer_uri):
         "data": [new_peer_uri],
         "from": "boot_node"
     }
-    compressed_response = gzip.compress(json.dumps(response).encode('utf-8'))
+    compressed_response = encode_message(response)
     failed_peers = []
     for uri, peer in list(PEERS.items()):
         if uri != new_peer_uri:
@@ -110,9 +110,9 @@ async def boot_handler(websocket):
             PEER_LAST_PING[client_address] = time.time()
             try:
                 if isinstance(message, bytes):
-                    msg = json.loads(gzip.decompress(message).decode('utf-8'))
+                    msg = decode_message(message)
                 else:
-                    msg = json.loads(message)
+                    msg = orjson.loads(message)
                 msg_type = msg.get('type')
                 msg_data = msg.get('data')
 
@@ -131,7 +131,7 @@ async def boot_handler(websocket):
                         "data": [uri for uri in PEERS.keys() if uri != peer_uri],
                         "from": "boot_node"
                     }
-                    compressed_response = gzip.compress(json.dumps(response).encode('utf-8'))
+                    compressed_response = encode_message(response)
                     await websocket.send(compressed_response)
                     # Notify all other peers of the new peer
                     await notify_peers(peer_uri)
@@ -168,7 +168,7 @@ async def boot_handler(websocket):
                                         "data": {"target_uri": target_uri, "reason": str(e)},
                                         "from": "boot_node"
                                     }
-                                    await websocket.send(gzip.compress(json.dumps(failure_msg).encode('utf-8')))
+                                    await websocket.send(encode_message(failure_msg))
                                 except Exception:
                                     pass
                     else:
@@ -180,12 +180,12 @@ async def boot_handler(websocket):
                                     "data": {"target_uri": target_uri, "reason": "peer not connected"},
                                     "from": "boot_node"
                                 }
-                                await websocket.send(gzip.compress(json.dumps(not_found_msg).encode('utf-8')))
+                                await websocket.send(encode_message(not_found_msg))
                             except Exception:
                                 pass
 
                 else:
-                    compressed_msg = gzip.compress(json.dumps(msg).encode('utf-8'))
+                    compressed_msg = encode_message(msg)
                     failed_peers = []
                     for uri, peer in list(PEERS.items()):
                         if uri != peer_uri:
@@ -207,7 +207,7 @@ async def boot_handler(websocket):
                             PEER_LAST_PING.pop(uri, None)
                             logger.info(f"Removed peer {uri} due to relay failure")
 
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"Invalid JSON from {client_address}: {e}")
             except Exception as e:
                 logger.error(f"Error processing message from {client_address}: {e}")
@@ -35,6 +35,8 @@ class Settings(BaseSettings):
     CHUNK_SIZE: int = 100
     CHUNK_TIMEOUT: int = 30
 
+    MAX_PAGE_SIZE: int = 100
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -64,3 +66,4 @@ TARGET_BLOCK_TIME = settings.TARGET_BLOCK_TIME
 BOOT_NODE = settings.boot_node
 CHUNK_SIZE = settings.CHUNK_SIZE
 CHUNK_TIMEOUT = settings.CHUNK_TIMEOUT
+MAX_PAGE_SIZE = settings.MAX_PAGE_SIZE
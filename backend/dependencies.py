@@ -3,7 +3,10 @@ from models.blockchain import Blockchain
 from models.transaction_pool import TransactionPool
 from services.pubsub import PubSub
 from services.fee_rate_estimator import FeeRateEstimator
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import socket
+import functools
 
 app = FastAPI()
 
@@ -16,6 +19,7 @@ app.state.blockchain = blockchain
 app.state.transaction_pool = transaction_pool
 app.state.pubsub = pubsub
 app.state.fee_rate_estimator = fee_rate_estimator
+app.state.mining_pool = None  # created by get_mining_pool on first use
 
 def get_blockchain():
     return app.state.blockchain
@@ -26,14 +30,27 @@ def get_transaction_pool():
 def get_pubsub():
     return app.state.pubsub
 
+@functools.lru_cache(maxsize=1)
 def get_public_ip():
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.settimeout(0.1)
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except Exception:
+        pass
+    try:
+        return socket.gethostbyname(socket.gethostname())
     except Exception:
         return "127.0.0.1"
+
 def get_fee_rate_estimator():
     return app.state.fee_rate_estimator
+
+def get_mining_pool():
+    # Started on first use rather than at import, so importing this module (as spawned
+    # workers do when they re-import __main__) never starts processes. Workers are
+    # spawned, not forked, so they cannot inherit locks held by the server's threads
+    if app.state.mining_pool is None:
+        app.state.mining_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    return app.state.mining_pool
@@ -1,12 +1,13 @@
 import asyncio
 import websockets
-import json
+import orjson
 import logging
 import os
 import sys
 import gzip
 from websockets.exceptions import ConnectionClosed
 from urllib.parse import urlparse
+from utils.codec import decode_message
 import ssl
 
 # Configure minimal logging to stdout only
@@ -47,19 +48,18 @@ async def boot_handler(websocket):
         async for message in websocket:
             try:
                 # Handle compressed or uncompressed messages
-                # Checks if the message is bytes (potentially gzipped) or string (JSON).
+                # Checks if the message is bytes (compressed frame) or string (JSON).
                 if isinstance(message, bytes):
                     try:
-                        # Attempt to decompress and decode gzip data.
-                        decompressed = gzip.decompress(message).decode('utf-8')
-                        msg = json.loads(decompressed)
-                    except gzip.BadGzipFile:
-                        # Log error for invalid gzip data and continue to next message.
-                        logger.error(f"Invalid gzip data from {client_address}")
+                        # Decode a codec-tagged (or legacy gzip) frame.
+                        msg = decode_message(message)
+                    except Exception as e:
+                        # Log error for undecodable data and continue to next message.
+                        logger.error(f"Invalid compressed data from {client_address}: {e}")
                         continue
                 else:
                     # Load JSON from uncompressed string message.
-                    msg = json.loads(message)
+                    msg = orjson.loads(message)
 
                 # Extract message type and data.
                 msg_type = msg.get('type')
@@ -83,16 +83,16 @@ async def boot_handler(websocket):
                     # Create a list of peers, excluding the newly registered one.
                     peer_list = list(REGISTERED_NODES - {uri})
                     # Prepare the response message containing the peer list.
-                    response = json.dumps({
+                    response = orjson.dumps({
                         'type': 'PEER_LIST',
                         'data': peer_list
                     })
                     # Compress the response using gzip.
-                    compressed_response = gzip.compress(response.encode('utf-8'))
+                    compressed_response = gzip.compress(response)
                     # Send the compressed response back to the client.
                     await websocket.send(compressed_response)
 
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 # Silently ignore messages that are not valid JSON.
                 continue
             except Exception as e:
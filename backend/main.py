@@ -1,4 +1,5 @@
 import asyncio
+import multiprocessing
 import threading
 import signal
 import sys
@@ -8,46 +9,66 @@ import socket
 from fastapi import FastAPI
 from uvicorn import Config, Server
 from fastapi.middleware.cors import CORSMiddleware
-from dependencies import app, get_blockchain, get_transaction_pool, get_pubsub,get_public_ip
 from core.config import settings
 
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 # logging.basicConfig(filename="app.log",level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-from routers import blockchain, transaction, wallet, general
 
-app.include_router(blockchain.router)
-app.include_router(transaction.router)
-app.include_router(wallet.router)
-app.include_router(general.router)
+def create_app() -> FastAPI:
+    # Importing dependencies builds the node (DuckDB connection, public IP lookup), so it
+    # is kept out of module scope: spawned mining and verification workers re-import
+    # this module as __mp_main__
+    from dependencies import app
+    from routers import blockchain, transaction, wallet, general
+
+    app.include_router(blockchain.router)
+    app.include_router(transaction.router)
+    app.include_router(wallet.router)
+    app.include_router(general.router)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 async def run_fastapi_server(app: FastAPI, port: int):
+    from dependencies import get_fee_rate_estimator
+    fee_rate_estimator = get_fee_rate_estimator()
     try:
-        config = Config(app=app, host="0.0.0.0", port=port, log_level="info",log_config=None)
+        # The estimator is only used by API handlers, so its refresher lives on this loop
+        fee_rate_estimator.start()
+        config = Config(app=app, host="0.0.0.0", port=port, log_level="info", log_config=None, http="httptools")
         # config = Config(app=app, host="0.0.0.0", port=port, log_level="info")
         server = Server(config)
         await server.serve()
     except Exception as e:
         logger.error(f"Error starting FastAPI server: {e}")
+    finally:
+        await fee_rate_estimator.stop()
 
 def handle_shutdown(sig, frame):
     logger.info(f"Shutdown signal ({sig}) received. Initiating graceful shutdown...")
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.call_soon_threadsafe(loop.stop)
+        from dependencies import get_pubsub
+        get_pubsub().stop_websocket_server()
     except Exception as e:
         logger.error(f"Error during shutdown handling: {e}")
 
 if __name__ == "__main__":
-    
+    multiprocessing.freeze_support()
+    from dependencies import get_blockchain, get_transaction_pool, get_pubsub, get_public_ip
+    app = create_app()
+
     os.environ['HOST'] = os.environ.get('HOST', get_public_ip())
     is_peer = settings.peer
     port = settings.root_port if not is_peer else 6784
@@ -59,47 +80,24 @@ if __name__ == "__main__":
     transaction_pool = get_transaction_pool()
     pubsub = get_pubsub()
 
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-    pubsub.loop = loop
+    def serve_api():
+        # The API gets its own loop; use uvloop for it when installed
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop else None) as runner:
+            runner.run(run_fastapi_server(app, port))
 
-    fastapi_thread = threading.Thread(
-        target=lambda: asyncio.run(run_fastapi_server(app, port)),
-        daemon=True
-    )
+    fastapi_thread = threading.Thread(target=serve_api, daemon=True)
     fastapi_thread.start()
 
     try:
-        websocket_server_task = loop.create_task(pubsub.start_server())
-        peer_discovery_task = loop.create_task(pubsub.run_peer_discovery())
-
-        loop.run_forever()
-
+        # The P2P node runs on its own loop (uvloop when installed) until handle_shutdown
+        # stops it, and closes itself on the way out
+        pubsub.start_websocket_server()
     except KeyboardInterrupt:
         pass
     except Exception as e:
         logger.error(f"An unexpected error occurred during asyncio loop execution: {e}")
-
     finally:
-        pending_tasks = asyncio.all_tasks(loop=loop)
-        pending_tasks = [task for task in pending_tasks if not task.cancelled() and not task.done()]
-
-        if pending_tasks:
-            for task in pending_tasks:
-                task.cancel()
-
-            try:
-                loop.run_until_complete(asyncio.gather(*pending_tasks, return_exceptions=True))
-            except asyncio.CancelledError:
-                pass
-            except Exception as e:
-                logger.error(f"Error during task cancellation waiting: {e}")
-
-        if not loop.is_closed():
-            loop.close()
+        if app.state.mining_pool is not None:
+            app.state.mining_pool.shutdown(wait=False, cancel_futures=True)
 
     sys.exit(0)
@@ -1,7 +1,7 @@
 import time
 import logging
 import json
-from utils.cryptohash import crypto_hash
+from utils.cryptohash import crypto_hash, crypto_hash_pair
 from core.config import MINRATE, BLOCK_SIZE_LIMIT, TARGET_BLOCK_TIME, BLOCK_SUBSIDY, HALVING_INTERVAL
 from utils.hex_to_binary import hex_to_binary
 from models.transaction import Transaction
@@ -61,9 +61,13 @@ class Block:
         self.nonce = nonce
         self.height = height if height is not None else 0
         self.version = version if version is not None else 1
-        self.merkle_root = merkle_root if merkle_root is not None else self.calculate_merkle_root()
+        self.merkle_root = merkle_root if merkle_root is not None else Block.calculate_merkle_root(data)
         self.tx_count = tx_count if tx_count is not None else len(data)
         self.logger = logging.getLogger(__name__)
+        self._merkle_layers = None
+        self._merkle_index = None
+        self._json = None
+        self._size_bytes = None
         self.validate_block()
 
     def validate_block(self):
@@ -94,18 +98,28 @@ class Block:
         
 
     def to_json(self):
-        return {
-            'timestamp': self.timestamp,
-            'last_hash': self.last_hash,
-            'hash': self.hash,
-            'data': self.data,
-            'difficulty': self.difficulty,
-            'nonce': self.nonce,
-            'height': self.height,
-            'version': getattr(self, 'version', 1),  # Ensure version exists
-            'merkle_root': self.merkle_root,
-            'tx_count': len(self.data)
-        }
+        # Blocks are immutable, so the dict is built once and shared by every caller
+        if self._json is None:
+            self._json = {
+                'timestamp': self.timestamp,
+                'last_hash': self.last_hash,
+                'hash': self.hash,
+                'data': self.data,
+                'difficulty': self.difficulty,
+                'nonce': self.nonce,
+                'height': self.height,
+                'version': getattr(self, 'version', 1),  # Ensure version exists
+                'merkle_root': self.merkle_root,
+                'tx_count': len(self.data)
+            }
+        return self._json
+
+    @property
+    def size_bytes(self):
+        """Serialized size of the block's transactions, as BLOCK_SIZE_LIMIT measures it."""
+        if self._size_bytes is None:
+            self._size_bytes = len(json.dumps(self.data).encode('utf-8'))
+        return self._size_bytes
 
     @staticmethod
     def mine_block(last_block, data):
@@ -148,10 +162,9 @@ class Block:
         )
 
     @staticmethod
-    def calculate_merkle_root(data):
-        if not data:
-            return crypto_hash('')
-
+    def build_merkle_layers(data):
+        """Every level of the Merkle tree, leaf hashes first and the root last.
+        An odd node is carried up to the next level unchanged."""
         hashes = []
         for tx in data:
             tx_json = tx if isinstance(tx, dict) else tx.to_json()
@@ -159,16 +172,49 @@ class Block:
             tx_hash = crypto_hash(serialized_tx)
             hashes.append(tx_hash)
 
+        layers = [hashes]
         while len(hashes) > 1:
             temp = []
             for i in range(0, len(hashes), 2):
                 if i + 1 < len(hashes):
-                    temp.append(crypto_hash(hashes[i] + hashes[i + 1]))
+                    temp.append(crypto_hash_pair(hashes[i], hashes[i + 1]))
                 else:
                     temp.append(hashes[i])
             hashes = temp
+            layers.append(hashes)
 
-        return hashes[0]
+        return layers
+
+    @staticmethod
+    def calculate_merkle_root(data):
+        if not data:
+            return crypto_hash('')
+
+        return Block.build_merkle_layers(data)[-1][0]
+
+    def merkle_layers(self):
+        """Merkle layers for this block, built on first access and kept for later proofs."""
+        if self._merkle_layers is None:
+            self._merkle_layers = Block.build_merkle_layers(self.data) if self.data else [[crypto_hash('')]]
+            self._merkle_index = {tx.get('id'): i for i, tx in enumerate(self.data)}
+        return self._merkle_layers
+
+    def proof(self, tx_id):
+        """Sibling path from the transaction's leaf up to the Merkle root, as
+        (hash, side) pairs where side is where the sibling sits. Levels where the
+        node was carried up without a sibling contribute nothing."""
+        layers = self.merkle_layers()
+        index = self._merkle_index.get(tx_id)
+        if index is None:
+            raise ValueError(f"Transaction {tx_id} not found in block {self.height}")
+
+        path = []
+        for layer in layers[:-1]:
+            sibling = index ^ 1
+            if sibling < len(layer):
+                path.append((layer[sibling], 'left' if sibling < index else 'right'))
+            index //= 2
+        return path
 
     @classmethod
     def genesis(cls):
@@ -201,6 +247,17 @@ class Block:
             tx_count=block_json.get('tx_count', len(block_json['data']))
         )
 
+    @staticmethod
+    def from_json_verified(blocks_json, known_tx_ids=()):
+        """Blocks from their JSON, after checking every transaction not in known_tx_ids
+        with Transaction.is_valid. Raises on the first invalid one. Picklable by name,
+        so chunks of a chain can be loaded in worker processes."""
+        for block_json in blocks_json:
+            for tx_json in block_json['data']:
+                if tx_json.get('id') not in known_tx_ids:
+                    Transaction.is_valid(Transaction.from_json(tx_json))
+        return [Block.from_json(block_json) for block_json in blocks_json]
+
     # @staticmethod
     # def adjust_difficulty(last_block, new_timestamp):
     #     time_diff = (new_timestamp - last_block.timestamp) / 1_000_000_000
@@ -252,7 +309,8 @@ class Block:
 
 
     @staticmethod
-    def is_valid_block(last_block, block):
+    def is_valid_block(last_block, block, verified_tx_ids=frozenset()):
+        # Transactions in verified_tx_ids had their signatures checked by the caller
         if not isinstance(last_block, Block) or not isinstance(block, Block):
             raise ValueError("Invalid block types")
 
@@ -274,11 +332,11 @@ class Block:
         if block.height != last_block.height + 1:
             raise ValueError("Block height must be one greater than last block height")
 
-        calculated_merkle_root = Block.calculate_merkle_root(block.data)
+        calculated_merkle_root = block.merkle_layers()[-1][0]
         if block.merkle_root != calculated_merkle_root:
             raise ValueError(f"Invalid Merkle root: expected {calculated_merkle_root}, got {block.merkle_root}")
 
-        if len(json.dumps(block.data).encode('utf-8')) > BLOCK_SIZE_LIMIT:
+        if block.size_bytes > BLOCK_SIZE_LIMIT:
             raise ValueError(f"Block data exceeds size limit of {BLOCK_SIZE_LIMIT} bytes")
 
         reconstructed_hash = crypto_hash(
@@ -294,7 +352,8 @@ class Block:
         coinbase_tx = None
         for tx_json in block.data:
             tx = Transaction.from_json(tx_json)
-            Transaction.is_valid(tx)
+            if tx.id not in verified_tx_ids:
+                Transaction.is_valid(tx)
             if tx.is_coinbase:
                 coinbase_count += 1
                 if coinbase_count > 1:
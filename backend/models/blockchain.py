@@ -2,9 +2,12 @@ import logging
 from models.transaction import Transaction
 from models.block import Block
 from core.config import (
-    BLOCK_SUBSIDY, HALVING_INTERVAL, MINING_REWARD_INPUT
+    BLOCK_SUBSIDY, HALVING_INTERVAL, MINING_REWARD_INPUT, MAX_PAGE_SIZE
 )
+from collections import deque
+import itertools
 import json
+import orjson
 import time
 
 class Blockchain:
@@ -13,8 +16,11 @@ class Blockchain:
         self.utxo_set = {}
         self.current_height = 0
         self.difficulty_adjustment_blocks = []
+        self._block_json_bytes = []
+        self._latest_json_ring = deque(maxlen=MAX_PAGE_SIZE)
         self.logger = logging.getLogger(__name__)
         self.initialize_utxo_set()
+        self.refresh_json_cache()
 
     def initialize_utxo_set(self):
         self.utxo_set = {}
@@ -28,8 +34,46 @@ class Blockchain:
                  self.logger.error(f"Error initializing UTXO from genesis transaction {tx_json.get('id', 'unknown')}: {str(e)}")
                  pass
 
+    def refresh_json_cache(self, old_chain=()):
+        # Blocks shared with old_chain, which the cache currently describes, keep their bytes
+        cached = self._block_json_bytes
+        keep = 0
+        for old_block, block in zip(old_chain, self.chain):
+            if keep >= len(cached) or old_block.hash != block.hash:
+                break
+            keep += 1
+        block_json_bytes = cached[:keep] + [orjson.dumps(block.to_json()) for block in self.chain[keep:]]
+        self._latest_json_ring = deque(block_json_bytes[-MAX_PAGE_SIZE:], maxlen=MAX_PAGE_SIZE)
+        self._block_json_bytes = block_json_bytes
+
+    def cache_block_json(self, block):
+        block_bytes = orjson.dumps(block.to_json())
+        self._block_json_bytes.append(block_bytes)
+        self._latest_json_ring.append(block_bytes)
+
+    def block_json(self, height):
+        block_json_bytes = self._block_json_bytes
+        if height < 0 or height >= len(block_json_bytes):
+            return None
+        return block_json_bytes[height]
+
+    def latest_blocks_json(self, limit):
+        ring = self._latest_json_ring
+        latest = itertools.islice(ring, max(0, len(ring) - limit), len(ring))
+        return b"[" + b",".join(reversed(list(latest))) + b"]"
+
     def add_block(self, transactions, transaction_pool=None):
         last_block = self.chain[-1]
+        validated_transactions_json = self.prepare_block_data(transactions, transaction_pool)
+        try:
+            new_block = Block.mine_block(last_block, validated_transactions_json)
+        except Exception as e:
+            self.logger.error(f"Error mining or adding block after {last_block.height}: {str(e)}")
+            raise Exception(f"Mining failed: {str(e)}")
+        return self.append_mined_block(new_block)
+
+    def prepare_block_data(self, transactions, transaction_pool=None):
+        last_block = self.chain[-1]
 
         validated_transactions = []
         total_fees = 0
@@ -69,18 +113,68 @@ class Blockchain:
              self.logger.warning("Mining genesis block with no transactions.")
              pass
 
+        return validated_transactions_json
+
+    def append_mined_block(self, new_block):
+        last_block = self.chain[-1]
+        if new_block.last_hash != last_block.hash:
+            raise Exception(f"Mining failed: chain tip moved to {last_block.hash[:8]}... while mining")
+        self.chain.append(new_block)
+        self.update_utxo_set(new_block)
+        self.cache_block_json(new_block)
+        self.current_height = new_block.height
+        self.logger.info(f"Successfully added block {new_block.height} with hash {new_block.hash[:8]}...")
+        return new_block
+
+
+    def try_extend(self, blocks, verified_tx_ids=frozenset()):
+        """Append blocks that continue the current tip, validating each against the one
+        before it and spending its inputs from the live UTXO set. All or nothing: on
+        failure the appended blocks are popped and every UTXO entry they touched is
+        restored, so the chain is never copied. Transactions in verified_tx_ids are not
+        signature-checked again."""
+        appended = 0
+        undo = {}  # tx id -> its UTXO entry before this call, or None if it had none
+
+        def touch(tx_id):
+            if tx_id not in undo:
+                entry = self.utxo_set.get(tx_id)
+                undo[tx_id] = dict(entry) if entry is not None else None
 
         try:
-            new_block = Block.mine_block(last_block, validated_transactions_json)
-            self.chain.append(new_block)
-            self.current_height = new_block.height
-            self.update_utxo_set(new_block)
-            self.logger.info(f"Successfully added block {new_block.height} with hash {new_block.hash[:8]}...")
-            return new_block
+            for block in blocks:
+                Block.is_valid_block(self.chain[-1], block, verified_tx_ids)
+                for tx_json in block.data:
+                    tx = Transaction.from_json(tx_json)
+                    if not tx.is_coinbase:
+                        input_address = tx.input.get('address')
+                        for prev_tx_id in tx.input.get('prev_tx_ids', []):
+                            if input_address not in self.utxo_set.get(prev_tx_id, {}):
+                                raise ValueError(f"UTXO {prev_tx_id} for tx {tx.id} not found or already spent")
+                            touch(prev_tx_id)
+                            del self.utxo_set[prev_tx_id][input_address]
+                            if not self.utxo_set[prev_tx_id]:
+                                del self.utxo_set[prev_tx_id]
+                    if tx.output:
+                        touch(tx.id)
+                        self.utxo_set[tx.id] = tx.output
+                self.chain.append(block)
+                appended += 1
         except Exception as e:
-            self.logger.error(f"Error mining or adding block after {last_block.height}: {str(e)}")
-            raise Exception(f"Mining failed: {str(e)}")
-
+            if appended:
+                del self.chain[-appended:]
+            for tx_id, entry in undo.items():
+                if entry is None:
+                    self.utxo_set.pop(tx_id, None)
+                else:
+                    self.utxo_set[tx_id] = entry
+            self.logger.error(f"Error extending chain: {str(e)}")
+            raise Exception(f"Chain extension failed: {str(e)}")
+
+        for block in blocks:
+            self.cache_block_json(block)
+        self.current_height = len(self.chain) - 1
+        self.logger.info(f"Extended chain to {self.current_height} blocks")
 
     def update_utxo_set(self, block):
         for tx_json in block.data:
@@ -104,13 +198,15 @@ class Blockchain:
                 self.logger.error(f"UTXO update failed for tx {tx_json.get('id', 'unknown')}: {str(e)}")
                 continue
 
-    def rebuild_utxo_set(self, chain):
+    def rebuild_utxo_set(self, chain, verified_tx_ids=frozenset()):
+        # Transactions in verified_tx_ids had their signatures checked by the caller
         temp_utxo = {}
         for block in chain:
             for tx_json in block.data:
                 try:
                     tx = Transaction.from_json(tx_json)
-                    Transaction.is_valid(tx, blockchain=None, transaction_pool=None)
+                    if tx.id not in verified_tx_ids:
+                        Transaction.is_valid(tx, blockchain=None, transaction_pool=None)
                     if not tx.is_coinbase:
                         if not hasattr(tx, 'input') or not isinstance(tx.input, dict):
                              raise ValueError(f"Transaction {tx.id} is missing required input data structure during rebuild.")
@@ -141,17 +237,18 @@ class Blockchain:
                      raise Exception(f"Failed to rebuild UTXO set for chain: Transaction {tx_json.get('id', 'unknown')} invalid: {str(e)}")
         return temp_utxo
 
-    def replace_chain(self, chain, transaction_pool=None):
+    def replace_chain(self, chain, transaction_pool=None, verified_tx_ids=frozenset()):
         old_chain = self.chain[:]
         old_utxo_set = self.utxo_set.copy()
         old_height = self.current_height
         try:
             if len(chain) <= len(self.chain):
                 raise ValueError("New chain must be longer")
-            self.is_valid_chain(chain, transaction_pool)
-            new_utxo_set = self.rebuild_utxo_set(chain)
+            self.is_valid_chain(chain, transaction_pool, verified_tx_ids)
+            new_utxo_set = self.rebuild_utxo_set(chain, verified_tx_ids)
             self.chain = chain
             self.utxo_set = new_utxo_set
+            self.refresh_json_cache(old_chain)
             self.current_height = len(chain) - 1
             self.logger.info(f"Replaced chain with {self.current_height} blocks")
         except Exception as e:
@@ -194,10 +291,11 @@ class Blockchain:
         blockchain.utxo_set = utxo_set_data
         blockchain.current_height = blockchain_json.get('current_height', len(blockchain.chain) - 1)
         blockchain.initialize_utxo_set()
+        blockchain.refresh_json_cache()
         return blockchain
 
     @staticmethod
-    def is_valid_chain(chain, transaction_pool=None):
+    def is_valid_chain(chain, transaction_pool=None, verified_tx_ids=frozenset()):
         if not chain or chain[0].to_json() != Block.genesis().to_json():
             raise ValueError("Invalid genesis block")
         utxo_set = {}
@@ -205,7 +303,7 @@ class Blockchain:
 
         for i, block in enumerate(chain):
             if i > 0:
-                Block.is_valid_block(chain[i-1], block)
+                Block.is_valid_block(chain[i-1], block, verified_tx_ids)
             if block.height != expected_height:
                 raise ValueError(f"Incorrect height at block {i}")
             expected_height += 1
@@ -216,14 +314,15 @@ class Blockchain:
                 try:
                     tx = Transaction.from_json(tx_json)
                     current_transaction_pool = transaction_pool if i == len(chain) - 1 else None
-                    Transaction.is_valid(tx, None, current_transaction_pool)
+                    if tx.id not in verified_tx_ids:
+                        Transaction.is_valid(tx, None, current_transaction_pool)
                     if tx.is_coinbase:
                         if has_coinbase:
                             raise ValueError("Multiple coinbase transactions")
                         has_coinbase = True
                         if not isinstance(tx.output, dict) or not tx.output:
                              raise ValueError("Invalid coinbase transaction output format")
-                        coinbase_reward = float(list(tx.output.values())[0])
+                        coinbase_reward = float(next(iter(tx.output.values())))
                     else:
                         block_total_fees += tx.fee
                         input_data = tx.input
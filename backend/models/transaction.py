@@ -42,6 +42,7 @@ class Transaction:
         self.public_key = public_key
         self.signature = signature
         self.logger = logging.getLogger(__name__)
+        self._json = None
         if is_coinbase:
             if output is None or input is None:
                 raise ValueError("Coinbase transaction requires output and input")
@@ -62,7 +63,7 @@ class Transaction:
                     raise ValueError("Invalid public key format")
 
                  estimated_size = self._calculate_size()
-                 self.fee = max(estimated_size * self.fee_rate, MIN_FEE)
+                 self.fee = Transaction.calculate_fee(self.fee_rate, estimated_size)
                  required_amount = self.amount + self.fee
 
                  input_data = self._create_input(sender_address, public_key, signature, required_amount=required_amount)
@@ -89,7 +90,7 @@ class Transaction:
                 self.size = self._calculate_size()
                 self.fee = input.get('fees', 0.0)
                 if not self.fee:
-                     self.fee = max(BASE_TX_SIZE * self.fee_rate, MIN_FEE)
+                     self.fee = Transaction.calculate_fee(self.fee_rate)
 
                 total_input_amount = input.get('amount', 0.0)
                 total_output_value = sum(self.output.values())
@@ -151,6 +152,12 @@ class Transaction:
         }
 
 
+    @staticmethod
+    def calculate_fee(fee_rate: float, size: int = BASE_TX_SIZE) -> float:
+        """Fee charged to a non-coinbase transaction of size bytes at fee_rate, never
+        less than MIN_FEE."""
+        return max(size * fee_rate, MIN_FEE)
+
     def _calculate_size(self) -> int:
         input_size = 0
         if hasattr(self, 'input') and self.input:
@@ -263,6 +270,19 @@ class Transaction:
             raise ValueError(f"Signature verification failed: {e}")
         return True
 
+    @staticmethod
+    def validation_errors(tx_jsons) -> List[Optional[str]]:
+        """Validate serialized transactions; for each, its error message or None if valid.
+        Picklable by name, so it can run in a worker process."""
+        errors = []
+        for tx_json in tx_jsons:
+            try:
+                Transaction.is_valid(Transaction.from_json(tx_json))
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+
     @staticmethod
     def create_coinbase(miner_address: str, block_height: int, total_fees: float = 0.0) -> 'Transaction':
         subsidy = BLOCK_SUBSIDY // (2 ** (block_height // HALVING_INTERVAL))
@@ -295,14 +315,17 @@ class Transaction:
         )
 
     def to_json(self) -> Dict:
-        return {
-            'id': self.id,
-            'input': self.input,
-            'output': self.output,
-            'fee': self.fee,
-            'size': self.size,
-            'is_coinbase': self.is_coinbase,
-        }
+        # Transactions are not modified once constructed, so the dict is built once
+        if self._json is None:
+            self._json = {
+                'id': self.id,
+                'input': self.input,
+                'output': self.output,
+                'fee': self.fee,
+                'size': self.size,
+                'is_coinbase': self.is_coinbase,
+            }
+        return self._json
 
     @classmethod
     def from_json(cls, transaction_dict: Dict) -> 'Transaction':
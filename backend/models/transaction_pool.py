@@ -1,9 +1,11 @@
 import logging
+import hashlib
 from models.transaction import Transaction
 
 class TransactionPool:
     def __init__(self):
         self.transaction_map = {}
+        self.digest = 0  # XOR of tx_digest over the pool, so peers can tell whether their pools match
         self.logger = logging.getLogger(__name__)
 
     def set_transaction(self, transaction):
@@ -13,10 +15,25 @@ class TransactionPool:
         Transaction.is_valid(transaction)
 
         if transaction.id in self.transaction_map:
-            if transaction.input.get('timestamp') > self.transaction_map[transaction.id].input.get('timestamp'):
+            existing = self.transaction_map[transaction.id]
+            if transaction.input.get('timestamp') > existing.input.get('timestamp'):
                 self.transaction_map[transaction.id] = transaction
+                self.digest ^= self.tx_digest(existing) ^ self.tx_digest(transaction)
             return
         self.transaction_map[transaction.id] = transaction
+        self.digest ^= self.tx_digest(transaction)
+
+    def remove_transaction(self, tx_id):
+        transaction = self.transaction_map.pop(tx_id, None)
+        if transaction is not None:
+            self.digest ^= self.tx_digest(transaction)
+        return transaction
+
+    @staticmethod
+    def tx_digest(transaction):
+        """64-bit hash of a transaction's id and version, combined into TransactionPool.digest."""
+        key = f"{transaction.id}:{transaction.input.get('timestamp', 0)}".encode('utf-8')
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
 
     def existing_transaction(self, transaction):
         if not isinstance(transaction, Transaction):
@@ -30,8 +47,7 @@ class TransactionPool:
         for block in blockchain.chain:
             for tx_json in block.data:
                 tx = Transaction.from_json(tx_json)
-                if tx.id in self.transaction_map:
-                    self.transaction_map.pop(tx.id)
+                self.remove_transaction(tx.id)
 
     def get_priority_transactions(self):
         return sorted(self.transaction_map.values(), key=lambda tx: tx.fee / tx.size, reverse=True)
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from dependencies import get_blockchain, get_transaction_pool, get_pubsub, get_fee_rate_estimator
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from dependencies import get_blockchain, get_transaction_pool, get_pubsub, get_fee_rate_estimator, get_mining_pool
+from models.block import Block
 from models.transaction import Transaction
 from models.blockchain import Blockchain
 from models.transaction_pool import TransactionPool
@@ -12,7 +13,7 @@ from schemas.blockchain import (
 )
 from typing import Optional, List, Dict
 from math import ceil
-from core.config import BLOCK_SIZE_LIMIT, HALVING_INTERVAL, BLOCK_SUBSIDY, PRIORITY_MULTIPLIERS, BASE_TX_SIZE
+from core.config import BLOCK_SIZE_LIMIT, HALVING_INTERVAL, BLOCK_SUBSIDY, PRIORITY_MULTIPLIERS, BASE_TX_SIZE, MAX_PAGE_SIZE
 from pydantic import BaseModel
 import logging
 import asyncio
@@ -20,12 +21,12 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 DEFAULT_PAGE_SIZE = 10
-MAX_PAGE_SIZE = 100
 
 BlockchainDep = Depends(get_blockchain)
 TransactionPoolDep = Depends(get_transaction_pool)
 PubSubDep = Depends(get_pubsub)
 FeeRateEstimatorDep = Depends(get_fee_rate_estimator)
+MiningPoolDep = Depends(get_mining_pool)
 
 class FeeRateResponse(BaseModel):
     fee_rate: float
@@ -33,13 +34,14 @@ class FeeRateResponse(BaseModel):
     mempool_size: int
     block_fullness: float
 from concurrent.futures import ProcessPoolExecutor
-executor = ProcessPoolExecutor()
+from concurrent.futures.process import BrokenProcessPool
 @router.post("/mine", response_model=MineBlockResponse, status_code=200)
 async def route_mine(
     request: MineBlockRequest,
     blockchain: Blockchain = BlockchainDep,
     transaction_pool: TransactionPool = TransactionPoolDep,
     pubsub: PubSub = PubSubDep,
+    mining_pool: ProcessPoolExecutor = MiningPoolDep,
 ):
     if not blockchain or not transaction_pool or not pubsub:
         raise HTTPException(status_code=500, detail="Server not fully initialized")
@@ -73,21 +75,31 @@ async def route_mine(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Coinbase creation failed: {str(e)}")
 
-    # Step 3: Heavy mining in background thread (non-blocking)
+    # Step 3: Proof-of-work in the mining process so it does not hold this worker's GIL
     try:
-        new_block = await asyncio.to_thread(
-            blockchain.add_block,
+        block_data = await asyncio.to_thread(
+            blockchain.prepare_block_data,
             [coinbase_tx] + valid_transactions,
             transaction_pool
         )
+        last_block = blockchain.chain[-1]
+        try:
+            mined_block = await asyncio.get_running_loop().run_in_executor(
+                mining_pool, Block.mine_block, last_block, block_data
+            )
+        except BrokenProcessPool as e:
+            logger.error(f"Mining process pool is broken ({e}), mining in a worker thread instead")
+            mined_block = await asyncio.to_thread(Block.mine_block, last_block, block_data)
+        new_block = blockchain.append_mined_block(mined_block)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mining failed: {str(e)}")
 
-    # Step 4: Continue lightweight I/O
+    # Step 4: Broadcast (only queued on the P2P loop) and persist off the event loop
     try:
-        pubsub.save_block_to_db(new_block)
-        transaction_pool.clear_blockchain_transactions(blockchain)
         pubsub.broadcast_block_sync(new_block)
+        # The API runs on its own loop, so this waits on the DuckDB writer thread directly
+        await asyncio.to_thread(pubsub.save_block_to_db, new_block)
+        transaction_pool.clear_blockchain_transactions(blockchain)
     except Exception as e:
         logger.warning(f"Post-mine actions failed: {str(e)}")
 
@@ -95,7 +107,7 @@ async def route_mine(
     return {
         "message": "Block mined successfully",
         "block": new_block.to_json(),
-        "reward": list(coinbase_tx.output.values())[0],
+        "reward": next(iter(coinbase_tx.output.values())),
         "confirmed_balance": blockchain.calculate_balance(request.miner_address)
     }
 
@@ -155,8 +167,7 @@ async def get_latest_blocks(
     if not blockchain.chain:
         raise HTTPException(status_code=404, detail="No blocks found")
 
-    blocks = blockchain.chain[-limit:][::-1]
-    return [block.to_json() for block in blocks]
+    return Response(blockchain.latest_blocks_json(limit), media_type="application/json")
 
 @router.get("/blockchain/range", response_model=BlockchainRangeResponse, status_code=200)
 async def route_blockchain_range(
@@ -198,13 +209,10 @@ async def route_blockchain_halving(blockchain: Blockchain = Depends(get_blockcha
 
 @router.get("/blockchain/height/{height}", response_model=BlockSchema, status_code=200)
 async def route_blockchain_height_by_height(height: int, blockchain: Blockchain = BlockchainDep):
-    if height < 0 or height > blockchain.current_height:
+    block_bytes = blockchain.block_json(height)
+    if block_bytes is None:
         raise HTTPException(status_code=400, detail="Invalid block height")
-    try:
-        block = blockchain.chain[height]
-        return block.to_json()
-    except IndexError:
-         raise HTTPException(status_code=404, detail="Block not found")
+    return Response(block_bytes, media_type="application/json")
 
 @router.get("/blockchain/hash/{block_hash}", response_model=BlockSchema, status_code=200)
 async def route_blockchain_hash(block_hash: str, blockchain: Blockchain = BlockchainDep):
@@ -237,10 +245,7 @@ async def route_fee_rate(
         if len(fee_rate_estimator.blockchain.chain) >= 10 \
         else fee_rate_estimator.blockchain.chain
 
-    total_recent_block_size = sum(
-        sum(len(str(tx)) for tx in block.data)
-        for block in recent_blocks
-    )
+    total_recent_block_size = sum(block.size_bytes for block in recent_blocks)
     block_fullness = (total_recent_block_size / (len(recent_blocks) * BLOCK_SIZE_LIMIT)) \
         if recent_blocks and BLOCK_SIZE_LIMIT > 0 else 0.0
 
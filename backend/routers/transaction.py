@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict
+from typing import Any, List, Dict
 from models.transaction import Transaction
 from models.transaction_pool import TransactionPool
 from dependencies import get_transaction_pool, get_blockchain
@@ -11,7 +11,7 @@ router = APIRouter()
 TransactionPoolDep = Depends(get_transaction_pool)
 BlockchainDep = Depends(get_blockchain)
 
-@router.get("/transactions", response_model=List[Dict], status_code=200)
+@router.get("/transactions", response_model=List[Dict[str, Any]], status_code=200)
 async def route_transactions(transaction_pool: TransactionPool = TransactionPoolDep):
     return transaction_pool.transaction_data()
 
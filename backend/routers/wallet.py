@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import Dict
+from typing import Any, Dict
 from models.transaction import Transaction
 from models.blockchain import Blockchain
 from models.transaction_pool import TransactionPool
@@ -28,11 +28,11 @@ class TransactRequest(BaseModel):
 
 class TransactResponse(BaseModel):
     message: str
-    transaction: Dict
+    transaction: Dict[str, Any]
     fee: float
     size: int
     timestamp: int
-    balance_info: Dict
+    balance_info: Dict[str, Any]
 
 @router.get("/wallet/info/{address}", response_model=WalletInfoResponse, status_code=200)
 async def route_wallet_info(
@@ -79,9 +79,10 @@ async def route_wallet_transact(
 
     if request.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
-    if available_balance < 0:
-        raise HTTPException(status_code=400, detail=f"Insufficient funds: {available_balance:.4f}")
-    if request.amount > available_balance:
+    # Same fee the Transaction constructor will charge, so funds can be checked
+    # before building (and signature-checking) a transaction we would reject
+    projected_fee = Transaction.calculate_fee(fee_rate)
+    if request.amount + projected_fee > available_balance:
         raise HTTPException(status_code=400, detail=f"Insufficient funds: {available_balance:.4f}")
 
     transaction = Transaction(
@@ -99,9 +100,9 @@ async def route_wallet_transact(
         raise HTTPException(status_code=400, detail="Transaction already in pool")
     transaction_pool.set_transaction(transaction)
     total_cost = request.amount + transaction.fee
-    if total_cost > confirmed_balance - pending_tx_spends:
-        transaction_pool.transaction_map.pop(transaction.id, None)
-        raise HTTPException(status_code=400, detail=f"Insufficient funds after fee: {confirmed_balance - pending_tx_spends:.4f}")
+    if total_cost > available_balance:
+        transaction_pool.remove_transaction(transaction.id)
+        raise HTTPException(status_code=400, detail=f"Insufficient funds after fee: {available_balance:.4f}")
     pubsub.broadcast_transaction_sync(transaction)
     return {
         "message": "Transaction created successfully",
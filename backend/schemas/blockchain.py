@@ -1,11 +1,11 @@
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Any
 
 class BlockSchema(BaseModel):
     timestamp: int
     last_hash: str
     hash: str
-    data: List[Dict]
+    data: List[Dict[str, Any]]
     difficulty: int
     nonce: int
     height: int
@@ -15,7 +15,7 @@ class BlockSchema(BaseModel):
 
 class BlockchainSchema(BaseModel):
     chain: List[BlockSchema]
-    utxo_set: Dict
+    utxo_set: Dict[str, Dict[str, float]]
     current_height: int
 
 class BlockchainRangeResponse(BaseModel):
@@ -1,38 +1,37 @@
-from pydantic import BaseModel, Field, NonNegativeFloat, NonNegativeInt
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Dict, List, Any, Optional
 
 class TransactionInput(BaseModel):
     timestamp: float
-    amount: Optional[NonNegativeFloat] = None
+    amount: Optional[float] = None
     address: str
     public_key: Optional[str] = None
     signature: Optional[Any] = None
     prev_tx_ids: Optional[List[str]] = None
     coinbase_data: Optional[str] = None
-    block_height: Optional[NonNegativeInt] = None
-    subsidy: Optional[NonNegativeFloat] = None
-    fees: Optional[NonNegativeFloat] = None
+    block_height: Optional[int] = None
+    subsidy: Optional[float] = None
+    fees: Optional[float] = None
 
 class TransactionSchema(BaseModel):
     id: str
     input: TransactionInput
-    output: Dict[str, NonNegativeFloat]
-    fee: NonNegativeFloat
-    size: NonNegativeInt
+    output: Dict[str, float]
+    fee: float
+    size: int
     is_coinbase: bool
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=False)
 
 class TransactionPoolSchema(BaseModel):
     transactions: List[TransactionSchema]
-    count: NonNegativeInt
+    count: int
 
 class TransactionByAddressSchema(BaseModel):
     id: str
     input: TransactionInput
-    output: Dict[str, NonNegativeFloat]
+    output: Dict[str, float]
     status: str
     timestamp: float
-    fee: NonNegativeFloat
-    blockHeight: Optional[NonNegativeInt] = None
\ No newline at end of file
+    fee: float
+    blockHeight: Optional[int] = None
\ No newline at end of file
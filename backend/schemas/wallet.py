@@ -15,11 +15,11 @@ class TransactRequest(BaseModel):
 
 class TransactResponse(BaseModel):
     message: str
-    transaction: Dict
+    transaction: Dict[str, Any]
     fee: float
     size: int
     timestamp: int
-    balance_info: Dict
+    balance_info: Dict[str, Any]
 
 class FeeRateResponse(BaseModel):
     fee_rate: float
@@ -337,195 +337,6 @@ class PubSub:
                     logger.error(f"Failed to sync chain: {e}")
             else:
                 logger.warning("No missing blocks received from peer")
-            """Synchronize blockchain with peers, fetching chunks in parallel."""
-            local_chain = self.load_blockchain_from_db()
-            try:
-                self.blockchain.replace_chain(local_chain)
-            except Exception as e:
-                logger.error(f"Failed to set local chain: {e}")
-                local_chain = [self.blockchain.chain[0]]  # Fallback to genesis
-            local_length = len(local_chain)
-            chains = {}
-            tasks = []
-            #   Request chain lengths from all peers
-            for uri in self.peer_nodes:
-                if uri not in self.peer_reliability or self.peer_reliability[uri] < 5:
-                    tasks.append(self.request_chain_length(uri))
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-            for uri, response in zip(self.peer_nodes.keys(), responses):
-                if isinstance(response, int) and response > local_length:
-                    chains[uri] = response
-                    logger.debug(f"Peer {uri} has chain length {response}")
-            if not chains:
-                logger.info("No peers have a longer chain")
-                return
-            #   Select the peer with the longest chain
-            selected_peer = max(chains, key=chains.get)
-            longest_length = chains[selected_peer]
-            logger.info(f"Selected peer {selected_peer} with chain length {longest_length}")
-            #   Fetch all missing blocks in chunks
-            start_index = local_length
-            missing_blocks = []
-            while start_index < longest_length:
-                end_index = min(start_index + self.chunk_size, longest_length)
-                logger.debug(f"Fetching...")
-            """Synchronize blockchain with peers, fetching chunks in parallel."""
-            local_chain = self.load_blockchain_from_db()
-            try:
-                self.blockchain.replace_chain(local_chain)
-            except Exception as e:
-                logger.error(f"Failed to set local chain: {e}")
-                local_chain = [self.blockchain.chain[0]]  # Fallback to genesis
-            local_length = len(local_chain)
-            chains = {}
-            tasks = []
-
-            # Request chain lengths from all peers
-            for uri in self.peer_nodes:
-                if uri not in self.peer_reliability or self.peer_reliability[uri] < 5:
-                    tasks.append(self.request_chain_length(uri))
-
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-            for uri, response in zip(self.peer_nodes.keys(), responses):
-                if isinstance(response, int) and response > local_length:
-                    chains[uri] = response
-                    logger.debug(f"Peer {uri} has chain length {response}")
-
-            if not chains:
-                logger.info("No peers have a longer chain")
-                return
-
-            print(len(chains))
-            if len(chains) == 1:
-                selected_peer = list(chains.keys())[0]
-                logger.info(f"Only one peer available ({selected_peer}), requesting full chain")
-                try:
-                    # Request the entire chain from the single peer
-                    async with websockets.connect(selected_peer) as ws:
-                        await ws.send(self.create_message(self.MSG_REQUEST_CHAIN, None))
-                        response = await ws.recv()
-                        msg = self.parse_message(response)
-                        if msg['type'] == self.MSG_RESPONSE_CHAIN:
-                            received_chain = [Block.from_json(block_data) for block_data in msg['data']]
-                            if len(received_chain) > len(self.blockchain.chain):
-                                logger.info(f"Received full chain of length {len(received_chain)} from {selected_peer}")
-                                self.blockchain.utxo_set.clear()
-                                self.blockchain.replace_chain(received_chain)
-                                for block in received_chain:
-                                    self.save_block_to_db(block)
-                                self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                                logger.info(f"Successfully synced full chain from {selected_peer}")
-                                return
-                except Exception as e:
-                    logger.error(f"Failed to get full chain from single peer {selected_peer}: {e}")
-
-            # Original chunk-based sync logic for multiple peers
-            selected_peer = max(chains, key=chains.get)
-            longest_length = chains[selected_peer]
-            logger.info(f"Selected peer {selected_peer} with chain length {longest_length}")
-
-            # Rest of the original chunk-based sync logic remains the same...
-            start_index = local_length
-            missing_blocks = []
-            while start_index < longest_length:
-                end_index = min(start_index + self.chunk_size, longest_length)
-                logger.debug(f"Fetching blocks {start_index} to {end_index-1} from {selected_peer}")
-                blocks = await self.fetch_blocks_from_peer(selected_peer, start_index, end_index)
-                if blocks:
-                    missing_blocks.extend(blocks)
-                    start_index = end_index
-                    self.update_peer_reliability(selected_peer, success=True)
-                    self.adjust_chunk_size(success=True)
-                else:
-                    logger.warning(f"Failed to fetch blocks {start_index} to {end_index-1}, retrying")
-                    self.update_peer_reliability(selected_peer, success=False)
-                    self.adjust_chunk_size(success=False)
-                    await asyncio.sleep(1)
-
-            if missing_blocks:
-                potential_chain = local_chain + missing_blocks
-                try:
-                    self.blockchain.utxo_set.clear()
-                    self.blockchain.replace_chain(potential_chain)
-                    for block in missing_blocks:
-                        self.save_block_to_db(block)
-                    self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                    logger.info(f"Synced {len(missing_blocks)} missing blocks, new chain length: {len(self.blockchain.chain)}")
-                    if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                        self.tx_pool_syncing = True
-                        await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
-                        self.last_tx_pool_request = time.time()
-                except Exception as e:
-                    logger.error(f"Failed to sync chain: {e}")
-            else:
-                logger.warning("No missing blocks received from peer")
-                """Synchronize blockchain with peers, fetching chunks in parallel."""
-                local_chain = self.load_blockchain_from_db()
-                try:
-                    self.blockchain.replace_chain(local_chain)
-                except Exception as e:
-                    logger.error(f"Failed to set local chain: {e}")
-                    local_chain = [self.blockchain.chain[0]]  # Fallback to genesis
-                local_length = len(local_chain)
-                chains = {}
-                tasks = []
-
-                # Request chain lengths from all peers
-                for uri in self.peer_nodes:
-                    if uri not in self.peer_reliability or self.peer_reliability[uri] < 5:
-                        tasks.append(self.request_chain_length(uri))
-
-                responses = await asyncio.gather(*tasks, return_exceptions=True)
-                for uri, response in zip(self.peer_nodes.keys(), responses):
-                    if isinstance(response, int) and response > local_length:
-                        chains[uri] = response
-                        logger.debug(f"Peer {uri} has chain length {response}")
-
-                if not chains:
-                    logger.info("No peers have a longer chain")
-                    return
-
-                # Select the peer with the longest chain
-                selected_peer = max(chains, key=chains.get)
-                longest_length = chains[selected_peer]
-                logger.info(f"Selected peer {selected_peer} with chain length {longest_length}")
-
-                # Fetch all missing blocks in chunks
-                start_index = local_length
-                missing_blocks = []
-                while start_index < longest_length:
-                    end_index = min(start_index + self.chunk_size, longest_length)
-                    logger.debug(f"Fetching blocks {start_index} to {end_index-1} from {selected_peer}")
-                    blocks = await self.fetch_blocks_from_peer(selected_peer, start_index, end_index)
-                    if blocks:
-                        missing_blocks.extend(blocks)
-                        start_index = end_index
-                        self.update_peer_reliability(selected_peer, success=True)
-                        self.adjust_chunk_size(success=True)
-                    else:
-                        logger.warning(f"Failed to fetch blocks {start_index} to {end_index-1}, retrying")
-                        self.update_peer_reliability(selected_peer, success=False)
-                        self.adjust_chunk_size(success=False)
-                        await asyncio.sleep(1)
-
-                if missing_blocks:
-                    potential_chain = local_chain + missing_blocks
-                    try:
-                        self.blockchain.utxo_set.clear()
-                        self.blockchain.replace_chain(potential_chain)
-                        for block in missing_blocks:
-                            self.save_block_to_db(block)
-                        self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                        logger.info(f"Synced {len(missing_blocks)} missing blocks, new chain length: {len(self.blockchain.chain)}")
-                        # Request tx pool to ensure sync
-                        if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                            self.tx_pool_syncing = True
-                            await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
-                            self.last_tx_pool_request = time.time()
-                    except Exception as e:
-                        logger.error(f"Failed to sync chain: {e}")
-                else:
-                    logger.warning("No missing blocks received from peer")
 
     async def request_chain_length(self, uri):
         """Request chain length from a peer."""
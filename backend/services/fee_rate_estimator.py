@@ -15,14 +15,37 @@ class FeeRateEstimator:
         self.current_fee_rate = DEFAULT_FEE_RATE
         self.last_update = 0
         self.lock = asyncio.Lock()
+        self._refresher = None
         self.logger = logging.getLogger(__name__)
 
+    def start(self):
+        """Refresh current_fee_rate every FEE_RATE_UPDATE_INTERVAL from one task on the running loop."""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.update_fee_rate()
+            except Exception as e:
+                self.logger.error(f"Error updating fee rate: {e}")
+            await asyncio.sleep(FEE_RATE_UPDATE_INTERVAL)
+
     async def update_fee_rate(self):
         async with self.lock:
             mempool_size = len(self.transaction_pool.transaction_map)
             recent_blocks = self.blockchain.chain[-10:] if len(self.blockchain.chain) >= 10 else self.blockchain.chain
             block_fullness = (
-                sum(sum(len(str(tx)) for tx in block.data) for block in recent_blocks) /
+                sum(block.size_bytes for block in recent_blocks) /
                 (len(recent_blocks) * BLOCK_SIZE_LIMIT)
             ) if recent_blocks else 0.0
             fee_rate = DEFAULT_FEE_RATE
@@ -38,5 +61,4 @@ class FeeRateEstimator:
             await self.update_fee_rate()
 
     def get_fee_rate(self):
-        asyncio.ensure_future(self.ensure_updated())
         return self.current_fee_rate
\ No newline at end of file
@@ -1,30 +1,54 @@
 import asyncio
 import websockets
 import json
+import orjson
 import logging
 import uuid
 import os
 import time
 import duckdb
-import gzip
-import aiohttp
 import miniupnpc
 import requests
 import stun
 import base64
+import socket
+import random
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
 from websockets.exceptions import ConnectionClosedError
 from models.block import Block
 from models.blockchain import Blockchain
 from models.transaction import Transaction
 from models.transaction_pool import TransactionPool
 from core.config import BOOT_NODE
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
+from utils.codec import CODEC_RAW, CODEC_ZSTD, CODEC_MSGPACK, encode_body, encode_message, encode_payload, decode_message, to_json_frame
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# blocks.hash is deliberately not indexed: DuckDB rejects INSERT OR REPLACE on tables
+# where the replaced columns are covered by an index. Hash lookups use the in-memory
+# _known_block_hashes set instead.
+INSERT_BLOCK_SQL = """
+    INSERT OR REPLACE INTO blocks (
+        index, timestamp, data, last_hash, hash, nonce,
+        difficulty, height, version, merkle_root, tx_count
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPSERT_PEER_SQL = "INSERT OR REPLACE INTO peers (uri, failures) VALUES (?, ?)"
+
+@functools.lru_cache(maxsize=1)
 def get_public_ip():
     try:
-        response = requests.get('https://api.ipify.org?format=json')
+        response = requests.get('https://api.ipify.org?format=json', timeout=5)
         return response.json()['ip']
     except Exception:
         return "127.0.0.1"
@@ -45,6 +69,59 @@ def open_port(port):
         logger.error(f"UPnP failed for port {port}: {str(e)}")
         logger.info(f"Please manually forward port {port} on your router")
 
+class FrameQueue(asyncio.Queue):
+    """asyncio.Queue of encoded frames that also counts as full once max_bytes of
+    frames are waiting, so a few large frames cannot pile up unbounded. Gossip is put
+    as (frame, True) so shed_gossip can drop it again to make room; frames put on their
+    own (requests, responses) are always delivered. get returns just the frame."""
+    def __init__(self, maxsize=0, max_bytes=0):
+        super().__init__(maxsize)
+        self.max_bytes = max_bytes
+        self.queued_bytes = 0
+        self.closed = False
+
+    def put_nowait(self, item):
+        if self.closed:
+            raise ConnectionError("Peer connection closed")
+        super().put_nowait(item)
+
+    def _put(self, item):
+        frame, gossip = item if isinstance(item, tuple) else (item, False)
+        super()._put((frame, gossip))
+        self.queued_bytes += len(frame)
+
+    def _get(self):
+        frame, _ = super()._get()
+        self.queued_bytes -= len(frame)
+        return frame
+
+    def shed_gossip(self):
+        """Drop the oldest queued gossip frame; False if none is queued."""
+        for i, (frame, gossip) in enumerate(self._queue):
+            if gossip:
+                del self._queue[i]
+                self.queued_bytes -= len(frame)
+                # As get_nowait does, let a sender waiting for room in on the freed slot
+                self._wakeup_next(self._putters)
+                return True
+        return False
+
+    def close(self):
+        """Discard the frames still queued, refuse further ones and fail the senders
+        waiting for room, once the writer draining this queue has stopped. Returns how
+        many frames were discarded."""
+        self.closed = True
+        discarded = len(self._queue)
+        self._queue.clear()
+        self.queued_bytes = 0
+        for putter in self._putters:
+            if not putter.done():
+                putter.set_exception(ConnectionError("Peer connection closed"))
+        return discarded
+
+    def full(self):
+        return super().full() or (self.max_bytes > 0 and self.queued_bytes >= self.max_bytes)
+
 class PubSub:
     def __init__(self, blockchain, transaction_pool):
         host = os.environ.get('HOST', get_public_ip())
@@ -52,32 +129,107 @@ class PubSub:
         self.transaction_pool = transaction_pool
         self.node_id = str(uuid.uuid4())
         self.peer_nodes = {}  # uri -> websocket
+        self.peer_send_queues = {}  # uri -> FrameQueue of frames for that peer's writer task
+        self._peer_writers = {}  # uri -> writer task draining peer_send_queues[uri]
+        self.send_timeout = 10  # seconds one websocket write may take before the peer is given up on
+        self.socket_buffer_size = 4 * 1024 * 1024  # SO_SNDBUF/SO_RCVBUF for peer connections
+        self.peer_queue_size = 1024  # frames a peer may fall behind before its oldest gossip is dropped
+        self.peer_queue_bytes = 16 * 1024 * 1024  # bytes of frames a peer may fall behind before its oldest gossip is dropped
+        self.max_peer_overflows = 256  # broadcasts in a row that may drop gossip for a peer before it is disconnected
+        self._peer_overflows = {}  # uri -> broadcasts in a row that found the peer's queue full
+        self._background_tasks = set()  # tasks started by spawn, held until they finish
+        self.stream_batch_size = 32  # blocks per frame when streaming a range of the chain
+        self.verify_chunk_size = 64  # blocks per verify_pool task when loading a received chain
+        self.offload_parse_size = 4096  # frames at least this large are decoded in a worker thread
+        self.max_batch_frames = 64  # queued frames a writer may coalesce into one BATCH message
+        self.max_batch_bytes = 256 * 1024  # bytes of queued frames a writer may coalesce into one BATCH message
+        self._tx_outbox = []  # (frame, exclude) NEW_TX gossip waiting for the next flush
+        self._tx_flush_task = None
+        self.tx_flush_interval = 0.02  # seconds NEW_TX gossip is held so it goes out in batches
+        self.tx_flush_size = 50  # queued NEW_TX frames that trigger an immediate flush
         self.relay_peers = {}  # uri -> boot_node_websocket for relay mode
         self.known_peers = set()
         self.peers_file = "peers.json"
         self.boot_node_uri = BOOT_NODE
         self.max_retries = 2
+        self.max_retry_delay = 60
         self.websocket_port = 3221 if os.environ.get('PEER') != 'True' else 3232
         self.public_ip = None
         self.public_port = None
         self.my_uri = f"ws://127.0.0.1:{self.websocket_port}"
         self.server = None
         self.loop = None
-        self.processed_transactions = set()
+        self._stop_event = None  # set by stop_websocket_server to end start_websocket_server
+        self._control_frames = {}  # (msg_type, binary) -> frame for messages without data
+        self._tx_pool_request = None  # (pool digest, REQUEST_TX_POOL frame)
+        self._json_frames = OrderedDict()  # MessagePack frame -> its JSON re-encoding, least recently used first
+        self._broadcast_cache = OrderedDict()  # (msg_type, key) -> encoded frame, least recently used first
+        self.broadcast_cache_size = 256
+        self.offload_block_txs = 50  # blocks with at least this many transactions are encoded in a worker thread
+        self._pending = {}  # req_id -> Future for requests awaiting a peer's response
+        self.request_timeout = 10
+        # Shared by peer connections in both directions. Full-chain responses outgrow the
+        # 1 MiB default frame limit. asyncio already sets TCP_NODELAY on its TCP transports.
+        # permessage-deflate is off: frames are zstd-compressed once when created, and
+        # deflate would compress them again for every peer they are sent to.
+        self.peer_ws_options = {
+            "ping_interval": 20,
+            "ping_timeout": 20,
+            "max_size": 8 * 1024 * 1024,
+            "compression": None,
+            "subprotocols": ["msgpack", "json"],
+        }
+        self.processed_transactions = OrderedDict()  # tx_id -> None, oldest first
+        self.max_processed_transactions = 100_000
+        self.tx_seen = OrderedDict()  # (tx_id, timestamp) -> None for gossip already validated, oldest first
+        self.max_tx_seen = 50_000
         self.syncing_chain = False
         self.blocks_in_transit = set()
         self.tx_pool_syncing = False
         self.last_tx_pool_request = 0
         self.tx_pool_request_cooldown = 5
         self.peer_reliability = {}
+        self.max_peer_failures = 5
+        self._reliable_peers = set()  # connected peers below max_peer_failures
         self.chunk_size = 10
         self.min_chunk_size = 5
         self.max_chunk_size = 50
         self.chunk_size_increment = 5
-        self.chunk_size_decrement = 5
+        self.fetch_target_time = 2  # seconds a block request should take at the measured block rate
+        self.block_rate = None  # EWMA of blocks per second received by block requests
+        self.block_rate_alpha = 0.3
+        self.max_parallel_fetches = 8
+        self.max_parallel_handshakes = 32  # outbound peer connections opened at once
+        self._handshake_slots = asyncio.Semaphore(self.max_parallel_handshakes)
+        self.max_sync_attempts = 5
+        self.compression_ratio = {}  # msg_type -> EWMA of compressed/raw size
+        self.compression_skips = {}  # msg_type -> messages sent raw since the last sample
+        self.compression_ratio_limit = 0.95
+        self.compression_ratio_alpha = 0.2
+        self.compression_resample_interval = 50
         self.db_file = "blockchain.db" if os.environ.get('PEER') != 'True' else "peer_blockchain.db"
         self.conn = duckdb.connect(self.db_file)
+        # Block writes run on one dedicated thread with its own cursor, so DuckDB commits
+        # never stall the event loop and writers from different threads are serialized
+        self._db_writer = self.conn.cursor()
+        self._db_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="duckdb-writer")
+        self._db_queue = asyncio.Queue()  # lists of blocks waiting for _db_writer_loop
+        self._db_writer_task = None
+        self.db_batch_size = 1000  # blocks _db_writer_loop may merge into one write
+        # Signature checks of synced blocks are CPU-bound, so they run in worker processes
+        self.verify_workers = os.cpu_count() or 1
+        self.verify_pool = None  # started by get_verify_pool on first use
+        # Blocks known to be stored, indexed by height. Writes keep it current, so loading
+        # the chain only reads rows above it from DuckDB.
+        self._block_cache = []
+        self._block_cache_lock = threading.Lock()
+        self._chain_response = None  # ((length, tip hash), RESPONSE_CHAIN frame) for the chain last sent
+        self._tx_pool_response = None  # ((pool digest, size), RESPONSE_TX_POOL frame) for the pool last sent
+        self._genesis = Block.from_json(self.blockchain.chain[0].to_json())
+        self._known_block_hashes = set()
+        self._unsaved_block_hashes = set()  # queued for _db_writer_loop but not yet committed
         self.initialize_db()
+        self._known_block_hashes.update(row[0] for row in self.conn.execute("SELECT hash FROM blocks").fetchall())
         self.MSG_NEW_BLOCK = "NEW_BLOCK"
         self.MSG_NEW_TX = "NEW_TX"
         self.MSG_REQUEST_CHAIN = "REQUEST_CHAIN"
@@ -86,6 +238,8 @@ class PubSub:
         self.MSG_PEER_LIST = "PEER_LIST"
         self.MSG_REQUEST_TX_POOL = "REQUEST_TX_POOL"
         self.MSG_RESPONSE_TX_POOL = "RESPONSE_TX_POOL"
+        self.MSG_RESPONSE_TX_POOL_UNCHANGED = "RESPONSE_TX_POOL_UNCHANGED"
+        self.MSG_RESPONSE_TX_POOL_IDS = "RESPONSE_TX_POOL_IDS"
         self.MSG_REQUEST_CHAIN_LENGTH = "REQUEST_CHAIN_LENGTH"
         self.MSG_RESPONSE_CHAIN_LENGTH = "RESPONSE_CHAIN_LENGTH"
         self.MSG_REQUEST_BLOCKS = "REQUEST_BLOCKS"
@@ -93,6 +247,29 @@ class PubSub:
         self.MSG_REQUEST_TX = "REQUEST_TX"
         self.MSG_RESPONSE_TX = "RESPONSE_TX"
         self.MSG_RELAY_FAILURE = "RELAY_FAILURE"
+        self.MSG_CHAIN_BLOCK = "CHAIN_BLOCK"
+        self.MSG_CHAIN_BLOCKS = "CHAIN_BLOCKS"
+        self.MSG_CHAIN_END = "CHAIN_END"
+        self.MSG_BATCH = "BATCH"
+        # msg_type -> coroutine handling that message's data
+        self._handlers = {
+            self.MSG_NEW_BLOCK: self._handle_new_block,
+            self.MSG_NEW_TX: self._handle_new_tx,
+            self.MSG_REQUEST_CHAIN: self._handle_request_chain,
+            self.MSG_RESPONSE_CHAIN: self._handle_response_chain,
+            self.MSG_REQUEST_TX_POOL: self._handle_request_tx_pool,
+            self.MSG_RESPONSE_TX_POOL_UNCHANGED: self._handle_response_tx_pool_unchanged,
+            self.MSG_RESPONSE_TX_POOL_IDS: self._handle_response_tx_pool_ids,
+            self.MSG_RESPONSE_TX_POOL: self._handle_response_tx_pool,
+            self.MSG_PEER_LIST: self._handle_peer_list,
+            self.MSG_REQUEST_CHAIN_LENGTH: self._handle_request_chain_length,
+            self.MSG_RESPONSE_CHAIN_LENGTH: self._handle_response_chain_length,
+            self.MSG_REQUEST_BLOCKS: self._handle_request_blocks,
+            self.MSG_RESPONSE_BLOCKS: self._handle_response_blocks,
+            self.MSG_BATCH: self._handle_batch,
+            self.MSG_REQUEST_TX: self._handle_request_tx,
+            self.MSG_RESPONSE_TX: self._handle_response_tx,
+        }
         
     async def initialize_async(self):
         self.public_ip, self.public_port = await self.get_public_ip_port()
@@ -100,7 +277,7 @@ class PubSub:
             self.my_uri = f"ws://{self.public_ip}:{self.public_port}"
             logger.info(f"Updated my_uri with STUN: {self.my_uri}")
         else:
-            self.public_ip = get_public_ip()
+            self.public_ip = await asyncio.to_thread(get_public_ip)
             self.public_port = self.websocket_port
             self.my_uri = f"ws://{self.public_ip}:{self.public_port}"
             logger.warning(f"STUN failed, using public IP from api.ipify.org: {self.my_uri}")
@@ -131,7 +308,7 @@ class PubSub:
             CREATE TABLE IF NOT EXISTS blocks (
                 index INTEGER,
                 timestamp BIGINT,
-                data JSON,
+                data BLOB,
                 last_hash VARCHAR,
                 hash VARCHAR,
                 nonce BIGINT,
@@ -143,109 +320,431 @@ class PubSub:
                 PRIMARY KEY (index)
             )
         """)
-        self.save_block_to_db(Block.from_json(self.blockchain.chain[0].to_json()))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS peers (
+                uri VARCHAR PRIMARY KEY,
+                failures INTEGER
+            )
+        """)
+        # Nodes created before block data was stored as BLOB still have a JSON column,
+        # which DuckDB re-parses on every insert
+        data_type = self.conn.execute(
+            "SELECT data_type FROM information_schema.columns WHERE table_name = 'blocks' AND column_name = 'data'"
+        ).fetchone()
+        if data_type and data_type[0] == 'JSON':
+            self.conn.execute("ALTER TABLE blocks ALTER data TYPE BLOB")
+        self.save_blocks_to_db([self._genesis])
+
+    def block_row(self, block):
+        return (
+            block.height,
+            block.timestamp,
+            orjson.dumps(block.data),
+            block.last_hash,
+            block.hash,
+            block.nonce,
+            block.difficulty,
+            block.height,
+            block.version,
+            block.merkle_root,
+            block.tx_count
+        )
+
+    def _cache_saved_blocks(self, blocks):
+        """Mirror a successful write into _block_cache. A contiguous run that starts inside
+        or right after the cache replaces its tail; anything else truncates the cache so
+        the rows are read back from DuckDB on the next load."""
+        blocks = sorted(blocks, key=lambda block: block.height)
+        low = blocks[0].height
+        contiguous = all(block.height == low + i for i, block in enumerate(blocks))
+        with self._block_cache_lock:
+            cache = self._block_cache
+            if contiguous and low <= len(cache):
+                # Stored rows above the run were not rewritten; they are read back on the next load
+                cache[low:] = blocks
+            else:
+                del cache[min(low, len(cache)):]
 
-    def save_block_to_db(self, block):
+    def _save_blocks_sync(self, blocks):
+        rows = [self.block_row(block) for block in blocks]
+        if not rows:
+            return
+        heights = {row[0] for row in rows}
         try:
-            self.conn.execute("""
-                INSERT OR REPLACE INTO blocks (
-                    index, timestamp, data, last_hash, hash, nonce,
-                    difficulty, height, version, merkle_root, tx_count
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                block.height,
-                block.timestamp,
-                json.dumps(block.data),
-                block.last_hash,
-                block.hash,
-                block.nonce,
-                block.difficulty,
-                block.height,
-                block.version,
-                block.merkle_root,
-                block.tx_count
-            ))
-            logger.info(f"Saved block {block.height} to DuckDB")
+            self._db_writer.begin()
+            # Blocks these rows overwrite stop being known, so their branch can come back
+            stored = self._db_writer.execute(
+                "SELECT index, hash FROM blocks WHERE index BETWEEN ? AND ?", [min(heights), max(heights)]
+            ).fetchall()
+            self._db_writer.executemany(INSERT_BLOCK_SQL, rows)
+            self._db_writer.commit()
+            self._cache_saved_blocks(blocks)
+            self._known_block_hashes.difference_update(
+                block_hash for height, block_hash in stored if height in heights
+            )
+            self._known_block_hashes.update(row[4] for row in rows)
+            self._unsaved_block_hashes.difference_update(row[4] for row in rows)
+            if len(rows) == 1:
+                logger.info(f"Saved block {rows[0][0]} to DuckDB")
+            else:
+                logger.info(f"Saved blocks {rows[0][0]} to {rows[-1][0]} to DuckDB")
         except Exception as e:
-            logger.error(f"Error saving block to DuckDB: {e}")
+            try:
+                self._db_writer.rollback()
+            except Exception:
+                pass
+            # Forget the failed blocks, so the next NEW_BLOCK carrying one is not dropped as a duplicate
+            self._unsaved_block_hashes.difference_update(row[4] for row in rows)
+            logger.error(f"Error saving blocks to DuckDB: {e}")
+
+    def save_blocks_to_db(self, blocks):
+        """Blocking save for callers outside the event loop."""
+        self._db_exec.submit(self._save_blocks_sync, list(blocks)).result()
+
+    def save_block_to_db(self, block):
+        self.save_blocks_to_db([block])
+
+    async def persist_blocks(self, blocks):
+        """save_blocks_to_db for coroutines on the P2P loop: queues the blocks for
+        _db_writer_loop and returns without waiting for the write. Other threads and
+        loops use save_blocks_to_db, since _db_queue belongs to the P2P loop."""
+        if self.loop is not None and asyncio.get_running_loop() is not self.loop:
+            raise RuntimeError("persist_blocks called off the P2P loop; use save_blocks_to_db")
+        blocks = list(blocks)
+        if not blocks:
+            return
+        self._unsaved_block_hashes.update(block.hash for block in blocks)
+        self._db_queue.put_nowait(blocks)
+        if self._db_writer_task is None or self._db_writer_task.done():
+            self._db_writer_task = asyncio.create_task(self._db_writer_loop())
+
+    async def _db_writer_loop(self):
+        """Write queued blocks in order. Everything queued while a write is in flight
+        goes out together in the next one, up to db_batch_size blocks. A None on the
+        queue (from close) ends the loop once everything before it is written."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = await self._db_queue.get()
+            if batch is None:
+                return
+            while len(batch) < self.db_batch_size and not self._db_queue.empty():
+                more = self._db_queue.get_nowait()
+                if more is None:
+                    stopping = True
+                    break
+                batch = batch + more
+            await loop.run_in_executor(self._db_exec, self._save_blocks_sync, self._latest_per_height(batch))
+
+    @staticmethod
+    def _latest_per_height(blocks):
+        # A height queued twice (a replaced chain) is written once, with the later block
+        return list({block.height: block for block in blocks}.values())
 
     def load_blockchain_from_db(self):
         try:
-            result = self.conn.execute("SELECT COUNT(*) FROM blocks").fetchone()
-            if not result or result[0] == 0:
+            with self._block_cache_lock:
+                cached = len(self._block_cache)
+            rows = self.conn.execute("""
+                SELECT timestamp, last_hash, hash, data, difficulty, nonce,
+                       height, version, merkle_root, tx_count
+                FROM blocks WHERE index >= ? ORDER BY index
+            """, (cached,)).fetchall()
+            loaded = [
+                Block(timestamp, last_hash, hash, orjson.loads(data), difficulty, nonce,
+                      height, version, merkle_root, tx_count)
+                for timestamp, last_hash, hash, data, difficulty, nonce,
+                    height, version, merkle_root, tx_count in rows
+            ]
+            with self._block_cache_lock:
+                stale = len(self._block_cache) != cached
+                if not stale:
+                    self._block_cache.extend(loaded)
+                    chain = list(self._block_cache)
+            if stale:
+                # A write landed while reading; start again from the updated cache
+                return self.load_blockchain_from_db()
+            if not chain:
                 logger.info("No blocks found in DuckDB, starting with genesis block")
-                return [Block.from_json(self.blockchain.chain[0].to_json())]
-            result = self.conn.execute("SELECT * FROM blocks ORDER BY index").fetchall()
-            chain = []
-            for row in result:
-                block_data = {
-                    "index": row[0],
-                    "timestamp": row[1],
-                    "data": json.loads(row[2]),
-                    "last_hash": row[3],
-                    "hash": row[4],
-                    "nonce": row[5],
-                    "difficulty": row[6],
-                    "height": row[7],
-                    "version": row[8],
-                    "merkle_root": row[9],
-                    "tx_count": row[10]
-                }
-                block = Block.from_json(block_data)
-                chain.append(block)
-            logger.info(f"Loaded {len(chain)} blocks from DuckDB")
+                return [self._genesis]
+            if loaded:
+                logger.info(f"Loaded {len(loaded)} blocks from DuckDB, {len(chain)} in total")
             return chain
         except Exception as e:
             logger.error(f"Error loading blockchain from DuckDB: {e}")
-            return [Block.from_json(self.blockchain.chain[0].to_json())]
+            return [self._genesis]
 
     def compress_data(self, data):
-        return gzip.compress(json.dumps(data).encode('utf-8'))
+        return encode_message(data)
 
     def decompress_data(self, compressed_data):
-        return json.loads(gzip.decompress(compressed_data).decode('utf-8'))
+        return decode_message(compressed_data)
 
     def update_peer_reliability(self, uri, success=True):
-        if uri not in self.peer_reliability:
-            self.peer_reliability[uri] = 0
+        previous = self.peer_reliability.get(uri, 0)
         if not success:
-            self.peer_reliability[uri] += 1
-            if self.peer_reliability[uri] >= 5:
+            self.peer_reliability[uri] = previous + 1
+            if self.peer_reliability[uri] >= self.max_peer_failures:
                 logger.warning(f"Peer {uri} marked as unreliable (failures: {self.peer_reliability[uri]})")
         else:
-            self.peer_reliability[uri] = max(0, self.peer_reliability[uri] - 1)
-
-    def adjust_chunk_size(self, success=True):
-        if success:
-            self.chunk_size = min(self.max_chunk_size, self.chunk_size + self.chunk_size_increment)
-            logger.debug(f"Increased chunk size to {self.chunk_size}")
-        else:
-            self.chunk_size = max(self.min_chunk_size, self.chunk_size - self.chunk_size_decrement)
+            self.peer_reliability[uri] = max(0, previous - 1)
+        if self.peer_reliability[uri] >= self.max_peer_failures:
+            self._reliable_peers.discard(uri)
+        elif uri in self.peer_nodes:
+            self._reliable_peers.add(uri)
+        if self.peer_reliability[uri] != previous and uri in self.known_peers:
+            self.save_peers([uri])
+
+    def adjust_chunk_size(self, success=True, blocks=0, elapsed=None):
+        """Halve chunk_size on failure; on success grow it additively toward the number
+        of blocks the measured block rate delivers in fetch_target_time."""
+        if not success:
+            self.chunk_size = max(self.min_chunk_size, self.chunk_size // 2)
             logger.debug(f"Decreased chunk size to {self.chunk_size}")
+            return
+        if blocks and elapsed is not None:
+            rate = blocks / max(elapsed, 0.001)
+            if self.block_rate is None:
+                self.block_rate = rate
+            else:
+                self.block_rate += self.block_rate_alpha * (rate - self.block_rate)
+        if self.block_rate is None:
+            target = self.max_chunk_size
+        else:
+            target = int(self.block_rate * self.fetch_target_time)
+        target = max(self.min_chunk_size, min(self.max_chunk_size, target))
+        self.chunk_size = min(target, self.chunk_size + self.chunk_size_increment)
+        logger.debug(f"Chunk size is now {self.chunk_size} (target {target})")
 
-    def create_message(self, msg_type, data):
+    def should_compress(self, msg_type):
+        if self.compression_ratio.get(msg_type, 0.0) <= self.compression_ratio_limit:
+            return True
+        # Types that do not compress are sent raw, but sampled now and then in case that changes
+        skips = self.compression_skips.get(msg_type, 0) + 1
+        if skips >= self.compression_resample_interval:
+            self.compression_skips[msg_type] = 0
+            return True
+        self.compression_skips[msg_type] = skips
+        return False
+
+    def create_message(self, msg_type, data, binary=True):
+        if data is None:
+            # Control messages carry no data, so their bytes never change
+            frame = self._control_frames.get((msg_type, binary))
+            if frame is None:
+                frame = self._control_frames[(msg_type, binary)] = self.encode_message_frame(msg_type, data, binary)
+            return frame
+        return self.encode_message_frame(msg_type, data, binary)
+
+    def encode_message_frame(self, msg_type, data, binary):
         message = {"type": msg_type, "data": data, "from": self.node_id}
-        return self.compress_data(message)
+        raw = encode_body(message, binary)
+        frame = encode_payload(raw, self.should_compress(msg_type), CODEC_MSGPACK if binary else CODEC_RAW)
+        if frame[0] & CODEC_ZSTD:
+            ratio = (len(frame) - 1) / len(raw)
+            previous = self.compression_ratio.get(msg_type, ratio)
+            alpha = self.compression_ratio_alpha
+            self.compression_ratio[msg_type] = previous + alpha * (ratio - previous)
+        return frame
+
+    def mark_processed(self, tx_id):
+        self.processed_transactions[tx_id] = None
+        self.processed_transactions.move_to_end(tx_id)
+        if len(self.processed_transactions) > self.max_processed_transactions:
+            self.processed_transactions.popitem(last=False)
+
+    def tx_pool_request(self):
+        """REQUEST_TX_POOL carrying our pool digest, so a peer with the same pool need not resend it."""
+        digest = self.transaction_pool.digest
+        if self._tx_pool_request is None or self._tx_pool_request[0] != digest:
+            self._tx_pool_request = (digest, self.create_message(self.MSG_REQUEST_TX_POOL, {"digest": digest}))
+        return self._tx_pool_request[1]
+
+    def is_known_transaction(self, tx_json):
+        """Whether tx_json is exactly a transaction the mempool holds, and so was verified
+        on admission. Compared by content, since the sender picks the id."""
+        tx = self.transaction_pool.transaction_map.get(tx_json.get('id'))
+        return tx is not None and tx.to_json() == tx_json
+
+    def mark_seen(self, key):
+        self.tx_seen[key] = None
+        self.tx_seen.move_to_end(key)
+        if len(self.tx_seen) > self.max_tx_seen:
+            self.tx_seen.popitem(last=False)
+
+    def frame_for(self, websocket, frame):
+        """The frame as this connection can read it: MessagePack only for peers that
+        negotiated the msgpack subprotocol, JSON for everyone else."""
+        if getattr(websocket, 'subprotocol', None) == "msgpack":
+            return frame
+        # A broadcast hands the same frame to every peer; re-encode it once for all JSON peers
+        json_frame = self._json_frames.get(frame)
+        if json_frame is None:
+            json_frame = to_json_frame(frame)
+            self._json_frames[frame] = json_frame
+            if len(self._json_frames) > self.broadcast_cache_size:
+                self._json_frames.popitem(last=False)
+        else:
+            self._json_frames.move_to_end(frame)
+        return json_frame
+
+    def peer_uri(self, websocket):
+        return f"ws://{websocket.remote_address[0]}:{websocket.remote_address[1]}"
+
+    async def send(self, websocket, frame):
+        """Queue a frame on the peer's writer task, or send it directly to connections
+        that have none (boot node, relays). Queued gossip gives way to the frame rather
+        than making it wait; if the writer stops, ConnectionError is raised."""
+        queue = self.peer_send_queues.get(self.peer_uri(websocket))
+        if queue is not None and not queue.closed and self.peer_nodes.get(self.peer_uri(websocket)) is websocket:
+            while queue.full() and queue.shed_gossip():
+                pass
+            await queue.put(frame)
+        else:
+            await websocket.send(self.frame_for(websocket, frame))
+
+    async def _peer_writer(self, uri, websocket, queue):
+        """Send everything queued for one peer in order, so a slow peer only ever
+        delays its own frames. Frames that pile up while a send is in flight go out
+        together as one BATCH message to peers that negotiated msgpack; older peers
+        would not understand BATCH and get each frame on its own."""
+        batching = getattr(websocket, 'subprotocol', None) == "msgpack"
+        carried = None
+        batch = []  # frames taken off the queue but not yet sent
+        corked = False
+        try:
+            while True:
+                frame = carried if carried is not None else await queue.get()
+                carried = None
+                batch = [frame]
+                size = len(frame)
+                while batching and len(batch) < self.max_batch_frames and not queue.empty():
+                    frame = queue.get_nowait()
+                    if size + len(frame) > self.max_batch_bytes:
+                        carried = frame
+                        break
+                    batch.append(frame)
+                    size += len(frame)
+                if len(batch) > 1:
+                    frame = self.create_message(self.MSG_BATCH, batch)
+                else:
+                    frame = batch[0]
+                if not corked and (carried is not None or not queue.empty()):
+                    # More frames follow this one; let them share TCP segments
+                    corked = self.set_cork(websocket, True)
+                await asyncio.wait_for(websocket.send(self.frame_for(websocket, frame)), self.send_timeout)
+                batch = []
+                if corked and carried is None and queue.empty():
+                    corked = not self.set_cork(websocket, False)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"Send to peer {uri} timed out after {self.send_timeout}s, falling back to relay")
+            self.update_peer_reliability(uri, success=False)
+        except Exception as e:
+            logger.warning(f"Stopped sending to peer {uri}: {e}")
+        finally:
+            if corked:
+                # Direct sends may still use this connection; don't leave them held back
+                self.set_cork(websocket, False)
+            unsent = len(batch) + (carried is not None) + queue.close()
+            if unsent:
+                logger.info(f"Discarded {unsent} unsent frames for peer {uri}")
+            if self.peer_send_queues.get(uri) is queue:
+                del self.peer_send_queues[uri]
+                self._peer_writers.pop(uri, None)
+
+    async def send_blocks(self, websocket, blocks, msg_type=None):
+        """Send blocks as a run of RESPONSE_BLOCKS (or msg_type) frames of stream_batch_size
+        blocks each, yielding to the loop between frames instead of encoding them all at once."""
+        msg_type = msg_type or self.MSG_RESPONSE_BLOCKS
+        for i in range(0, len(blocks), self.stream_batch_size):
+            batch = blocks[i:i + self.stream_batch_size]
+            # The first and last hash pin down the whole run, so peers catching up over
+            # the same range share one encoded frame
+            key = (batch[0].hash, batch[-1].hash)
+            frame = self.gossip_message(msg_type, key, [block.to_json() for block in batch])
+            await self.send(websocket, frame)
+            await asyncio.sleep(0)
+
+    def gossip_message(self, msg_type, key, data):
+        """create_message for data identified by key (a gossiped block or transaction, a
+        run of blocks), reusing the frame already built for the same key."""
+        cache_key = (msg_type, key)
+        frame = self._broadcast_cache.get(cache_key)
+        if frame is not None:
+            self._broadcast_cache.move_to_end(cache_key)
+            return frame
+        frame = self.create_message(msg_type, data)
+        self._broadcast_cache[cache_key] = frame
+        if len(self._broadcast_cache) > self.broadcast_cache_size:
+            self._broadcast_cache.popitem(last=False)
+        return frame
+
+    def relay_frame(self, msg_type, key, data, message):
+        """gossip_message for data that arrived as the frame message. A tagged frame is
+        forwarded as received, since only its 'from' differs from what we would encode
+        and nothing reads that, so relaying costs no re-encode or recompression."""
+        if isinstance(message, bytes):
+            self.cache_gossip_frame(msg_type, key, message)
+        return self.gossip_message(msg_type, key, data)
+
+    def cache_gossip_frame(self, msg_type, key, frame):
+        """Make frame what gossip_message returns for key, unless a frame is already cached."""
+        cache_key = (msg_type, key)
+        if cache_key not in self._broadcast_cache:
+            self._broadcast_cache[cache_key] = frame
+            if len(self._broadcast_cache) > self.broadcast_cache_size:
+                self._broadcast_cache.popitem(last=False)
 
     def parse_message(self, message):
         try:
             if isinstance(message, bytes):
                 msg = self.decompress_data(message)
             else:
-                msg = json.loads(message)
+                msg = orjson.loads(message)
             return msg
         except Exception as e:
             logger.error(f"Error parsing message: {e}")
-            raise json.JSONDecodeError("Invalid message", str(message), 0)
+            raise orjson.JSONDecodeError("Invalid message", str(message), 0)
 
-    def save_peers(self):
+    async def parse_message_async(self, message):
+        """parse_message, moved off the event loop for frames big enough to stall it."""
+        if len(message) >= self.offload_parse_size:
+            return await asyncio.to_thread(self.parse_message, message)
+        return self.parse_message(message)
+
+    def save_peers(self, uris):
+        rows = [(uri, self.peer_reliability.get(uri, 0)) for uri in uris]
+        if not rows:
+            return
         try:
-            with open(self.peers_file, "w") as f:
-                json.dump(list(self.known_peers), f)
+            self.conn.executemany(UPSERT_PEER_SQL, rows)
         except Exception as e:
             logger.error(f"Error saving peers: {e}")
 
+    def forget_peer(self, uri):
+        try:
+            self.conn.execute("DELETE FROM peers WHERE uri = ?", (uri,))
+        except Exception as e:
+            logger.error(f"Error removing peer {uri}: {e}")
+
     def load_peers(self):
+        try:
+            rows = self.conn.execute("SELECT uri, failures FROM peers").fetchall()
+            if not rows:
+                legacy = self.load_legacy_peers()
+                self.save_peers(legacy)
+                return legacy
+            for uri, failures in rows:
+                self.peer_reliability.setdefault(uri, failures)
+            return {uri for uri, _ in rows}
+        except Exception as e:
+            logger.error(f"Error loading peers: {e}")
+            return set()
+
+    def load_legacy_peers(self):
+        """Peers saved to peers.json before they moved into DuckDB."""
         try:
             if os.path.exists(self.peers_file) and os.path.getsize(self.peers_file) > 0:
                 with open(self.peers_file, "r") as f:
@@ -259,44 +758,161 @@ class PubSub:
             logger.error(f"Error loading peers: {e}")
             return set()
 
+    async def close(self):
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        for writer in self._peer_writers.values():
+            writer.cancel()
+        for task in list(self._background_tasks):
+            task.cancel()
+        if self._tx_flush_task is not None:
+            self._tx_flush_task.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.verify_pool is not None:
+            self.verify_pool.shutdown(wait=False, cancel_futures=True)
+        if self._db_writer_task is not None and not self._db_writer_task.done():
+            # Let the writer finish what it holds rather than cancelling it mid-batch
+            self._db_queue.put_nowait(None)
+            try:
+                await self._db_writer_task
+            except Exception as e:
+                logger.error(f"DuckDB writer failed while closing: {e}")
+        remaining = []
+        while not self._db_queue.empty():
+            blocks = self._db_queue.get_nowait()
+            if blocks is not None:
+                remaining.extend(blocks)
+        if remaining:
+            self._db_exec.submit(self._save_blocks_sync, self._latest_per_height(remaining))
+        await asyncio.get_running_loop().run_in_executor(None, self._db_exec.shutdown)
+
+    async def request(self, uri, msg_type, data, timeout=None):
+        """Send a request over the peer's open websocket and wait for the response
+        carrying the same req_id."""
+        websocket = self.peer_nodes.get(uri)
+        if websocket is None:
+            raise ConnectionError(f"No open connection to {uri}")
+        req_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = future
+        try:
+            await self.send(websocket, self.create_message(msg_type, {"req_id": req_id, **data}))
+            return await asyncio.wait_for(future, timeout or self.request_timeout)
+        finally:
+            self._pending.pop(req_id, None)
+
+    def resolve_request(self, data, result):
+        """Complete the pending request a response belongs to; False if it is unsolicited."""
+        if not isinstance(data, dict):
+            return False
+        future = self._pending.get(data.get("req_id"))
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(result)
+        return True
+
     async def fetch_blocks_from_peer(self, uri, start_height, end_height):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{uri}/request_blocks", json={"start_height": start_height, "end_height": end_height}) as response:
-                    if response.status == 200:
-                        compressed_data = await response.read()
-                        blocks_data = self.decompress_data(compressed_data)
-                        blocks = [Block.from_json(block_data) for block_data in blocks_data]
-                        self.update_peer_reliability(uri, success=True)
-                        self.adjust_chunk_size(success=True)
-                        return blocks
-                    else:
-                        self.update_peer_reliability(uri, success=False)
-                        self.adjust_chunk_size(success=False)
-                        return []
+            started = time.monotonic()
+            blocks_data = await self.request(
+                uri, self.MSG_REQUEST_BLOCKS, {"start_height": start_height, "end_height": end_height}
+            )
+            elapsed = time.monotonic() - started
+            blocks = [Block.from_json(block_data) for block_data in blocks_data]
+            if blocks:
+                self.update_peer_reliability(uri, success=True)
+                self.adjust_chunk_size(success=True, blocks=len(blocks), elapsed=elapsed)
+            else:
+                self.update_peer_reliability(uri, success=False)
+                self.adjust_chunk_size(success=False)
+            return blocks
         except Exception as e:
             logger.error(f"Failed to fetch blocks from {uri}: {e}")
             self.update_peer_reliability(uri, success=False)
             self.adjust_chunk_size(success=False)
             return []
 
+    async def fetch_missing_blocks(self, chains, start_height, end_height):
+        """Fetch blocks [start_height, end_height) as fixed windows spread over every peer
+        whose chain covers them, most reliable first. Failed windows are retried on the
+        next peer; the result stops at the first window that could not be fetched."""
+        windows = [
+            (start, min(start + self.chunk_size, end_height))
+            for start in range(start_height, end_height, self.chunk_size)
+        ]
+        peers = sorted(
+            (uri for uri in chains if uri != self.my_uri),
+            key=lambda uri: self.peer_reliability.get(uri, 0)
+        )
+        semaphore = asyncio.Semaphore(self.max_parallel_fetches)
+
+        async def fetch(window, peer):
+            async with semaphore:
+                logger.debug(f"Fetching blocks {window[0]} to {window[1]-1} from {peer}")
+                return await self.fetch_blocks_from_peer(peer, window[0], window[1])
+
+        fetched = {}
+        pending = windows
+        for attempt in range(self.max_sync_attempts):
+            assignments = []
+            for i, window in enumerate(pending):
+                eligible = [uri for uri in peers if chains[uri] >= window[1]]
+                if eligible:
+                    assignments.append((window, eligible[(i + attempt) % len(eligible)]))
+            results = await asyncio.gather(
+                *(fetch(window, peer) for window, peer in assignments),
+                return_exceptions=True
+            )
+            pending = []
+            for (window, peer), blocks in zip(assignments, results):
+                # Only accept a window that is complete and in order, so the windows join up
+                if isinstance(blocks, list) and [block.height for block in blocks] == list(range(*window)):
+                    fetched[window] = blocks
+                else:
+                    logger.warning(f"Failed to fetch blocks {window[0]} to {window[1]-1} from {peer}, retrying")
+                    pending.append(window)
+            if not pending:
+                break
+            await asyncio.sleep(1)
+
+        missing_blocks = []
+        for window in windows:
+            if window not in fetched:
+                logger.warning(f"Giving up on blocks from {window[0]} after {self.max_sync_attempts} attempts")
+                break
+            missing_blocks.extend(fetched[window])
+        return missing_blocks
+
     async def sync_with_peers(self):
         local_chain = self.load_blockchain_from_db()
         try:
             self.blockchain.replace_chain(local_chain)
         except Exception as e:
             logger.error(f"Failed to set local chain: {e}")
-            local_chain = [Block.from_json(self.blockchain.chain[0].to_json())]
-        local_length = len(local_chain)
-        chains = {}
-        tasks = []
+        await self.catch_up_with_peers(full_sync=True)
 
-        for uri in self.peer_nodes:
-            if uri not in self.peer_reliability or self.peer_reliability[uri] < 5 and uri != self.my_uri:
-                tasks.append(self.request_chain_length(uri))
+    async def catch_up_with_peers(self, full_sync=False):
+        """Ask every reliable peer for its chain length and fetch the blocks this node is
+        missing, in windows spread across the peers that have them. Only with full_sync,
+        at startup, may a single peer's whole chain replace the local one."""
+        self.syncing_chain = True
+        try:
+            await self._catch_up_with_peers(full_sync)
+        finally:
+            self.syncing_chain = False
+
+    async def _catch_up_with_peers(self, full_sync):
+        local_length = len(self.blockchain.chain)
+        chains = {}
 
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
-        for uri, response in zip(self.peer_nodes.keys(), responses):
+        peers = [uri for uri in self._reliable_peers if uri != self.my_uri]
+        responses = await asyncio.gather(*(self.request_chain_length(uri) for uri in peers), return_exceptions=True)
+        for uri, response in zip(peers, responses):
             if isinstance(response, int) and response >= local_length:
                 chains[uri] = response
                 logger.debug(f"Peer {uri} has chain length {response}")
@@ -305,338 +921,590 @@ class PubSub:
             logger.info("No peers have a longer or equal chain")
             return
 
-        if len(chains) == 1:
+        if len(chains) == 1 and full_sync:
             selected_peer = list(chains.keys())[0]
             if selected_peer == self.my_uri:
                 logger.info("Only peer is self, not syncing")
                 return
-            logger.info(f"Only one peer available ({selected_peer}), requesting full chain")
-            try:
-                async with websockets.connect(selected_peer) as ws:
-                    await ws.send(self.create_message(self.MSG_REQUEST_CHAIN, None))
-                    response = await ws.recv()
-                    msg = self.parse_message(response)
-                    if msg['type'] == self.MSG_RESPONSE_CHAIN:
-                        received_chain = [Block.from_json(block_data) for block_data in msg['data']]
-                        if len(received_chain) >= len(self.blockchain.chain):
-                            logger.info(f"Received chain of length {len(received_chain)} from {selected_peer}")
-                            self.blockchain.utxo_set.clear()
-                            self.blockchain.replace_chain(received_chain)
-                            for block in received_chain:
-                                self.save_block_to_db(block)
-                            self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                            logger.info(f"Successfully synced full chain from {selected_peer}")
-                            return
-            except Exception as e:
-                logger.error(f"Failed to get full chain from single peer {selected_peer}: {e}")
+            if await self._sync_full(selected_peer, chains[selected_peer]):
+                return
 
         selected_peer = max(chains, key=chains.get)
         longest_length = chains[selected_peer]
         logger.info(f"Selected peer {selected_peer} with chain length {longest_length}")
+        # A stream that ended early may still have extended the chain
+        await self._sync_chunks(chains, len(self.blockchain.chain), longest_length)
 
-        start_index = local_length
-        missing_blocks = []
-        while start_index < longest_length:
-            end_index = min(start_index + self.chunk_size, longest_length)
-            logger.debug(f"Fetching blocks {start_index} to {end_index-1} from {selected_peer}")
-            blocks = await self.fetch_blocks_from_peer(selected_peer, start_index, end_index)
-            if blocks:
-                missing_blocks.extend(blocks)
-                start_index = end_index
-                self.update_peer_reliability(selected_peer, success=True)
-                self.adjust_chunk_size(success=True)
+    async def _sync_full(self, peer, length):
+        """Replace the local chain with the peer's full chain of length blocks; True if
+        that succeeded. A connected peer is asked over its open connection."""
+        logger.info(f"Only one peer available ({peer}), requesting full chain")
+        try:
+            if peer not in self.peer_nodes:
+                return await self._sync_streamed_chain(peer, length)
+            received_chain = await self.fetch_missing_blocks({peer: length}, 0, length)
+            if len(received_chain) != length:
+                # A fetch that gave up part way returns only a prefix of the chain
+                logger.warning(f"Received {len(received_chain)} of {length} blocks from {peer}, syncing in chunks instead")
+                return False
+            logger.info(f"Received chain of length {len(received_chain)} from {peer}")
+            self.blockchain.replace_chain(received_chain)
+            await self.persist_blocks(received_chain)
+            self.transaction_pool.clear_blockchain_transactions(self.blockchain)
+            logger.info(f"Successfully synced full chain from {peer}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to get full chain from single peer {peer}: {e}")
+        return False
+
+    async def _sync_streamed_chain(self, peer, length):
+        """Apply the peer's streamed chain batch by batch, as _sync_full does for a
+        connected peer; True if all length blocks arrived and were applied. Each batch
+        is verified as it arrives, blocks the local chain already holds are dropped, and
+        blocks that continue the tip go through try_extend and on to the database right
+        away. Only a peer chain that forks from the local one is held in memory, from the
+        fork point on, for one replace_chain once the stream ends."""
+        received = 0
+        fork = None  # the local chain up to the fork point, then the peer's blocks
+        fork_height = None
+        fork_tx_ids = set()
+
+        async def apply_batch(blocks_data):
+            nonlocal received, fork, fork_height
+            errors = await self.verify_blocks_transactions(blocks_data)
+            for block_data, error in zip(blocks_data, errors):
+                if error is not None:
+                    raise ValueError(f"Invalid transaction in block {block_data.get('height')}: {error}")
+            blocks = [Block.from_json(block_data) for block_data in blocks_data]
+            received += len(blocks)
+            # verify_blocks_transactions has checked every transaction of these blocks
+            verified_tx_ids = frozenset(tx_json.get('id') for block in blocks for tx_json in block.data)
+            if fork is not None:
+                fork.extend(blocks)
+                fork_tx_ids.update(verified_tx_ids)
+                return
+            chain = self.blockchain.chain
+            for i, block in enumerate(blocks):
+                if not (0 <= block.height < len(chain) and chain[block.height].hash == block.hash):
+                    break
             else:
-                logger.warning(f"Failed to fetch blocks {start_index} to {end_index-1}, retrying")
-                self.update_peer_reliability(selected_peer, success=False)
-                self.adjust_chunk_size(success=False)
-                await asyncio.sleep(1)
+                return
+            new_blocks = blocks[i:]
+            height = new_blocks[0].height
+            if height == len(chain):
+                self.blockchain.try_extend(new_blocks, verified_tx_ids)
+                await self.persist_blocks(new_blocks)
+            elif 0 < height < len(chain):
+                fork = chain[:height] + new_blocks
+                fork_height = height
+                fork_tx_ids.update(verified_tx_ids)
+            else:
+                raise ValueError(f"Streamed block at height {height} does not follow the local chain")
+
+        await self._stream_chain(peer, apply_batch)
+        if received != length:
+            logger.warning(f"Received {received} of {length} blocks from {peer}, syncing in chunks instead")
+            return False
+        if fork is not None:
+            logger.info(f"Chain from {peer} forks at height {fork_height}, replacing the local chain")
+            self.blockchain.replace_chain(fork, verified_tx_ids=frozenset(fork_tx_ids))
+            await self.persist_blocks(fork[fork_height:])
+        self.transaction_pool.clear_blockchain_transactions(self.blockchain)
+        logger.info(f"Successfully synced full chain from {peer}")
+        return True
+
+    async def _stream_chain(self, peer, apply_batch):
+        """Stream the peer's full chain over a connection opened just for it, awaiting
+        apply_batch on the serialized blocks of each frame as it arrives."""
+        async with websockets.connect(peer, **self.peer_ws_options) as ws:
+            await self.send(ws, self.create_message(self.MSG_REQUEST_CHAIN, {"stream": True, "batch": True}))
+            while True:
+                msg = await self.parse_message_async(await asyncio.wait_for(ws.recv(), self.request_timeout))
+                if msg['type'] == self.MSG_CHAIN_BLOCKS:
+                    await apply_batch(msg['data'])
+                elif msg['type'] == self.MSG_CHAIN_BLOCK:
+                    # Peer streams one block per frame
+                    await apply_batch([msg['data']])
+                elif msg['type'] == self.MSG_CHAIN_END:
+                    return
+                elif msg['type'] == self.MSG_RESPONSE_CHAIN:
+                    # Peer predates streaming and sent the whole chain in one frame
+                    await apply_batch(msg['data'])
+                    return
+                # Anything else is the peer's own greeting on a new connection
+
+    async def _sync_chunks(self, chains, local_length, target_length):
+        """Extend the chain from local_length up to target_length with blocks fetched in
+        chunks from chains' peers."""
+        if target_length <= local_length:
+            logger.info("Chain is already as long as the longest peer chain")
+            return
+        missing_blocks = await self.fetch_missing_blocks(chains, local_length, target_length)
 
         if missing_blocks:
-            potential_chain = local_chain + missing_blocks
             try:
-                self.blockchain.utxo_set.clear()
-                self.blockchain.replace_chain(potential_chain)
-                for block in missing_blocks:
-                    self.save_block_to_db(block)
+                self.blockchain.try_extend(missing_blocks)
+                await self.persist_blocks(missing_blocks)
                 self.transaction_pool.clear_blockchain_transactions(self.blockchain)
                 logger.info(f"Synced {len(missing_blocks)} missing blocks, new chain length: {len(self.blockchain.chain)}")
                 if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
                     self.tx_pool_syncing = True
-                    await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
+                    await self.broadcast(self.tx_pool_request())
                     self.last_tx_pool_request = time.time()
             except Exception as e:
                 logger.error(f"Failed to sync chain: {e}")
         else:
             logger.warning("No missing blocks received from peer")
 
+    def get_verify_pool(self):
+        """The verify_pool, started on first use rather than when PubSub is built at
+        import time, which spawned worker processes repeat. Workers are spawned rather
+        than forked, since the event loop and DuckDB writer threads are running by now."""
+        if self.verify_pool is None:
+            self.verify_pool = ProcessPoolExecutor(
+                max_workers=self.verify_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.verify_pool
+
+    async def verify_blocks_transactions(self, blocks_data):
+        """For each serialized block, the first error among its transactions, or None.
+        The transactions of all the blocks are pooled and split into one slice per
+        verify_pool worker. Transactions the mempool already holds unchanged are not
+        checked again."""
+        owners = []  # index into blocks_data of each transaction in tx_jsons
+        tx_jsons = []
+        for i, block_data in enumerate(blocks_data):
+            for tx_json in block_data.get('data', []):
+                if not self.is_known_transaction(tx_json):
+                    owners.append(i)
+                    tx_jsons.append(tx_json)
+        size = max(1, -(-len(tx_jsons) // self.verify_workers))
+        slices = [tx_jsons[i:i + size] for i in range(0, len(tx_jsons), size)]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self.get_verify_pool(), Transaction.validation_errors, txs) for txs in slices)
+            )
+        except BrokenProcessPool as e:
+            logger.error(f"Verification process pool is broken ({e}), verifying in a worker thread instead")
+            results = await asyncio.to_thread(lambda: [Transaction.validation_errors(txs) for txs in slices])
+
+        errors = [None] * len(blocks_data)
+        for owner, error in zip(owners, (error for result in results for error in result)):
+            if error is not None and errors[owner] is None:
+                errors[owner] = error
+        return errors
+
+    async def load_blocks(self, blocks_data):
+        """Block.from_json_verified over blocks_data, in chunks spread across verify_pool.
+        Transactions the mempool already holds unchanged are not checked again."""
+        size = self.verify_chunk_size
+        chunks = []
+        for i in range(0, len(blocks_data), size):
+            chunk = blocks_data[i:i + size]
+            known, unknown = set(), set()
+            for block_data in chunk:
+                for tx_json in block_data['data']:
+                    (known if self.is_known_transaction(tx_json) else unknown).add(tx_json.get('id'))
+            # from_json_verified skips by id, so an id that also appears with other content is checked
+            chunks.append((chunk, frozenset(known - unknown)))
+        loop = asyncio.get_running_loop()
+        try:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self.get_verify_pool(), Block.from_json_verified, chunk, known) for chunk, known in chunks)
+            )
+        except BrokenProcessPool as e:
+            logger.error(f"Verification process pool is broken ({e}), verifying in a worker thread instead")
+            results = await asyncio.to_thread(lambda: [Block.from_json_verified(chunk, known) for chunk, known in chunks])
+        return [block for blocks in results for block in blocks]
+
     async def request_chain_length(self, uri):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{uri}/chain_length") as response:
-                    if response.status == 200:
-                        return await response.json()
-                    return 0
+            return await self.request(uri, self.MSG_REQUEST_CHAIN_LENGTH, {})
         except Exception:
             return 0
 
-    async def handle_message(self, message, websocket):
+    async def handle_message(self, message, websocket, in_batch=False):
         try:
-            msg = self.parse_message(message)
+            msg = await self.parse_message_async(message)
             msg_type = msg['type']
             logger.info(f"Received message type: {msg_type}")
-            from_id = msg.get('from', 'unknown')
-            data = msg['data']
-            peer_uri = f"ws://{websocket.remote_address[0]}:{websocket.remote_address[1]}"
-
-            if msg_type == self.MSG_NEW_BLOCK:
-                block = Block.from_json(data)
-                last_block = self.blockchain.chain[-1]
-                if block.hash == last_block.hash:
-                    logger.info("Duplicate block received. Skipping.")
-                    return
-                potential_chain = self.blockchain.chain[:]
-                potential_chain.append(block)
+            if in_batch and msg_type == self.MSG_BATCH:
+                # _peer_writer never nests batches, so a nested one is not from a well-behaved peer
+                logger.warning(f"Dropping BATCH nested inside a BATCH from {self.peer_uri(websocket)}")
+                return
+            handler = self._handlers.get(msg_type)
+            if handler is not None:
+                await handler(msg['data'], websocket, message)
+        except orjson.JSONDecodeError:
+            logger.error(f"Invalid JSON message received: {message}")
+        except Exception as e:
+            logger.error(f"Error handling message: {e}")
+
+    async def _handle_new_block(self, data, websocket, message):
+        block = Block.from_json(data)
+        if block.hash in self._known_block_hashes or block.hash in self._unsaved_block_hashes:
+            logger.info("Duplicate block received. Skipping.")
+            return
+        try:
+            utxo_set = self.blockchain.utxo_set
+            inputs = []
+            for tx_json in block.data:
+                input_data = tx_json.get('input') or {}
+                if not tx_json.get('is_coinbase', input_data.get('address') == 'coinbase'):
+                    inputs.append(input_data)
+            missing = list(dict.fromkeys(
+                prev_tx_id
+                for input_data in inputs
+                for prev_tx_id in input_data.get('prev_tx_ids', [])
+                if input_data.get('address') not in utxo_set.get(prev_tx_id, ())
+            ))
+            if missing:
+                await self.send(websocket, self.create_message(self.MSG_REQUEST_TX, missing))
+                logger.info(f"Requested {len(missing)} missing transactions")
+                return
+            for input_data in inputs:
+                input_address = input_data.get('address')
+                input_amount = input_data.get('amount', 0)
+                utxo_amount = sum(utxo_set[prev_tx_id][input_address] for prev_tx_id in input_data.get('prev_tx_ids', []))
+                if input_amount > utxo_amount:
+                    raise ValueError(f"Invalid transaction input: input amount {input_amount} exceeds UTXO amount {utxo_amount}")
+            # Transactions the mempool holds unchanged were verified on admission. The skip
+            # is by id, so an id that also appears with other content is still checked.
+            known, unknown = set(), set()
+            for tx_json in block.data:
+                (known if self.is_known_transaction(tx_json) else unknown).add(tx_json.get('id'))
+            verified_tx_ids = frozenset(known - unknown)
+            self.blockchain.try_extend([block], verified_tx_ids)
+            await self.persist_blocks([block])
+            self.transaction_pool.clear_blockchain_transactions(self.blockchain)
+            await self.broadcast(self.relay_frame(self.MSG_NEW_BLOCK, block.hash, data, message), exclude=websocket)
+        except Exception as e:
+            logger.error(f"Failed to replace chain: {e}")
+
+    async def _handle_new_tx(self, data, websocket, message):
+        transaction = Transaction.from_json(data)
+        tx_id = transaction.id
+        tx_time = transaction.input.get('timestamp', 0)
+        seen_key = (tx_id, tx_time)
+        if seen_key in self.tx_seen:
+            # Already verified and relayed this exact version; skip the signature check
+            self.tx_seen.move_to_end(seen_key)
+            return
+        existing_tx = self.transaction_pool.transaction_map.get(tx_id)
+        if existing_tx:
+            if tx_time > existing_tx.input['timestamp']:
                 try:
-                    for tx_json in block.data:
-                        tx = Transaction.from_json(tx_json)
-                        if not tx.is_coinbase:
-                            input_data = tx.input
-                            prev_tx_ids = input_data.get('prev_tx_ids', [])
-                            input_address = input_data.get('address')
-                            input_amount = input_data.get('amount', 0)
-                            utxo_amount = 0
-                            for prev_tx_id in prev_tx_ids:
-                                if prev_tx_id not in self.blockchain.utxo_set or input_address not in self.blockchain.utxo_set[prev_tx_id]:
-                                    await websocket.send(self.create_message(self.MSG_REQUEST_TX, prev_tx_id))
-                                    logger.info(f"Requested missing transaction {prev_tx_id}")
-                                    return
-                                utxo_amount += self.blockchain.utxo_set[prev_tx_id].get(input_address, 0)
-                            if input_amount > utxo_amount:
-                                raise ValueError(f"Invalid transaction input: input amount {input_amount} exceeds UTXO amount {utxo_amount}")
-                    self.blockchain.replace_chain(potential_chain)
-                    self.save_block_to_db(block)
-                    self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                    await self.broadcast(self.create_message(self.MSG_NEW_BLOCK, data), exclude=websocket)
+                    Transaction.is_valid(transaction)
+                    self.mark_seen(seen_key)
+                    self.transaction_pool.set_transaction(transaction)
+                    await self.gossip_transaction(self.relay_frame(self.MSG_NEW_TX, seen_key, data, message), exclude=websocket)
+                    if time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
+                        self.tx_pool_syncing = True
+                        await self.broadcast(self.tx_pool_request())
+                        self.last_tx_pool_request = time.time()
                 except Exception as e:
-                    logger.error(f"Failed to replace chain: {e}")
+                    logger.error(f"Failed to update transaction {tx_id}: {e}")
+        elif tx_id not in self.processed_transactions:
+            try:
+                Transaction.is_valid(transaction)
+                self.mark_seen(seen_key)
+                self.transaction_pool.set_transaction(transaction)
+                self.mark_processed(tx_id)
+                await self.gossip_transaction(self.relay_frame(self.MSG_NEW_TX, seen_key, data, message), exclude=websocket)
+                if time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
+                    self.tx_pool_syncing = True
+                    await self.broadcast(self.tx_pool_request())
+                    self.last_tx_pool_request = time.time()
+            except Exception as e:
+                logger.error(f"Failed to add transaction {tx_id}: {e}")
+
+    async def _handle_request_chain(self, data, websocket, message):
+        if isinstance(data, dict) and data.get("batch"):
+            await self.send_blocks(websocket, list(self.blockchain.chain), self.MSG_CHAIN_BLOCKS)
+            await self.send(websocket, self.create_message(self.MSG_CHAIN_END, None))
+        elif isinstance(data, dict) and data.get("stream"):
+            for i, block in enumerate(list(self.blockchain.chain), 1):
+                await self.send(websocket, self.create_message(self.MSG_CHAIN_BLOCK, block.to_json()))
+                if i % self.stream_batch_size == 0:
+                    await asyncio.sleep(0)
+            await self.send(websocket, self.create_message(self.MSG_CHAIN_END, None))
+        else:
+            chain = self.blockchain.chain
+            key = (len(chain), chain[-1].hash)
+            if self._chain_response is None or self._chain_response[0] != key:
+                chain_data = [block.to_json() for block in chain]
+                frame = await asyncio.to_thread(self.create_message, self.MSG_RESPONSE_CHAIN, chain_data)
+                self._chain_response = (key, frame)
+            await self.send(websocket, self._chain_response[1])
+
+    async def _handle_response_chain(self, data, websocket, message):
+        try:
+            if len(data) >= len(self.blockchain.chain) and not self.syncing_chain:
+                self.syncing_chain = True
+                received_chain = await self.load_blocks(data)
+                logger.info(f"Received chain of length {len(received_chain)}")
+                # load_blocks has checked every transaction's signature
+                verified_tx_ids = frozenset(tx_json.get('id') for block in received_chain for tx_json in block.data)
+                self.blockchain.replace_chain(received_chain, verified_tx_ids=verified_tx_ids)
+                await self.persist_blocks(received_chain)
+                self.transaction_pool.clear_blockchain_transactions(self.blockchain)
+                if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
+                    self.tx_pool_syncing = True
+                    await self.broadcast(self.tx_pool_request())
+                    self.last_tx_pool_request = time.time()
+            else:
+                logger.debug("Received chain not longer or equal or syncing, ignoring")
+        except Exception as e:
+            logger.error(f"Failed to replace chain with received chain: {e}")
+        finally:
+            self.syncing_chain = False
+
+    async def _handle_request_tx_pool(self, data, websocket, message):
+        if isinstance(data, dict) and "digest" in data:
+            # The requester understands digests: say the pools match, or list what we
+            # hold so it can REQUEST_TX just the transactions it lacks
+            if data["digest"] == self.transaction_pool.digest:
+                await self.send(websocket, self.create_message(self.MSG_RESPONSE_TX_POOL_UNCHANGED, None))
+            else:
+                tx_versions = [
+                    [tx.id, tx.input.get('timestamp', 0)]
+                    for tx in self.transaction_pool.transaction_map.values()
+                ]
+                await self.send(websocket, self.create_message(self.MSG_RESPONSE_TX_POOL_IDS, tx_versions))
+            return
+        pool = self.transaction_pool.transaction_map
+        key = (self.transaction_pool.digest, len(pool))
+        if self._tx_pool_response is None or self._tx_pool_response[0] != key:
+            tx_pool_data = [tx.to_json() for tx in pool.values()]
+            self._tx_pool_response = (key, self.create_message(self.MSG_RESPONSE_TX_POOL, tx_pool_data))
+        await self.send(websocket, self._tx_pool_response[1])
+
+    async def _handle_response_tx_pool_unchanged(self, data, websocket, message):
+        self.tx_pool_syncing = False
+
+    async def _handle_response_tx_pool_ids(self, data, websocket, message):
+        pool = self.transaction_pool.transaction_map
+        wanted = []
+        for tx_id, tx_time in data:
+            existing_tx = pool.get(tx_id)
+            if existing_tx:
+                if tx_time > existing_tx.input['timestamp']:
+                    wanted.append(tx_id)
+            elif tx_id not in self.processed_transactions:
+                wanted.append(tx_id)
+        if wanted:
+            await self.send(websocket, self.create_message(self.MSG_REQUEST_TX, wanted))
+            logger.info(f"Requested {len(wanted)} transactions missing from pool")
+        self.tx_pool_syncing = False
 
-            elif msg_type == self.MSG_NEW_TX:
-                transaction = Transaction.from_json(data)
+    async def _handle_response_tx_pool(self, data, websocket, message):
+        if not self.tx_pool_syncing:
+            logger.debug("Ignoring RESPONSE_TX_POOL as not syncing")
+            return
+        added_count = 0
+        for tx_data in data:
+            try:
+                transaction = Transaction.from_json(tx_data)
                 tx_id = transaction.id
                 tx_time = transaction.input.get('timestamp', 0)
                 existing_tx = self.transaction_pool.transaction_map.get(tx_id)
                 if existing_tx:
                     if tx_time > existing_tx.input['timestamp']:
-                        try:
-                            Transaction.is_valid(transaction)
-                            self.transaction_pool.set_transaction(transaction)
-                            await self.broadcast(self.create_message(self.MSG_NEW_TX, data), exclude=websocket)
-                            if time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                                self.tx_pool_syncing = True
-                                await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
-                                self.last_tx_pool_request = time.time()
-                        except Exception as e:
-                            logger.error(f"Failed to update transaction {tx_id}: {e}")
-                elif tx_id not in self.processed_transactions:
-                    try:
                         Transaction.is_valid(transaction)
                         self.transaction_pool.set_transaction(transaction)
-                        self.processed_transactions.add(tx_id)
-                        await self.broadcast(self.create_message(self.MSG_NEW_TX, data), exclude=websocket)
-                        if time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                            self.tx_pool_syncing = True
-                            await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
-                            self.last_tx_pool_request = time.time()
-                    except Exception as e:
-                        logger.error(f"Failed to add transaction {tx_id}: {e}")
-
-            elif msg_type == self.MSG_REQUEST_CHAIN:
-                chain_data = [block.to_json() for block in self.blockchain.chain]
-                await websocket.send(self.create_message(self.MSG_RESPONSE_CHAIN, chain_data))
+                        added_count += 1
+                elif tx_id not in self.processed_transactions:
+                    Transaction.is_valid(transaction)
+                    self.transaction_pool.set_transaction(transaction)
+                    self.mark_processed(tx_id)
+                    added_count += 1
+            except Exception as e:
+                logger.error(f"Failed to add or update transaction from peer: {e}")
+        logger.info(f"Added/updated {added_count} transactions to pool")
+        if added_count == 0:
+            self.tx_pool_syncing = False
+        elif time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
+            await self.broadcast(self.tx_pool_request())
+            self.last_tx_pool_request = time.time()
 
-            elif msg_type == self.MSG_RESPONSE_CHAIN:
-                try:
-                    received_chain = [Block.from_json(block_data) for block_data in data]
-                    if len(received_chain) >= len(self.blockchain.chain) and not self.syncing_chain:
-                        logger.info(f"Received chain of length {len(received_chain)}")
-                        self.syncing_chain = True
-                        self.blockchain.utxo_set.clear()
-                        self.blockchain.replace_chain(received_chain)
-                        for block in received_chain:
-                            self.save_block_to_db(block)
-                        self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                        if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                            self.tx_pool_syncing = True
-                            await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
-                            self.last_tx_pool_request = time.time()
-                    else:
-                        logger.debug("Received chain not longer or equal or syncing, ignoring")
-                except Exception as e:
-                    logger.error(f"Failed to replace chain with received chain: {e}")
-                finally:
-                    self.syncing_chain = False
+    async def _handle_peer_list(self, data, websocket, message):
+        peer_uri = self.peer_uri(websocket)
+        for peer_uri in data:
+            if peer_uri != self.node_id and peer_uri != self.my_uri and peer_uri not in self.peer_nodes and peer_uri not in self.known_peers:
+                self.known_peers.add(peer_uri)
+                self.save_peers([peer_uri])
+                self.spawn(self.connect_to_peer(peer_uri))
+
+    async def _handle_request_chain_length(self, data, websocket, message):
+        if isinstance(data, dict) and "req_id" in data:
+            response = {"req_id": data["req_id"], "length": len(self.blockchain.chain)}
+        else:
+            response = len(self.blockchain.chain)
+        await self.send(websocket, self.create_message(self.MSG_RESPONSE_CHAIN_LENGTH, response))
 
-            elif msg_type == self.MSG_REQUEST_TX_POOL:
-                tx_pool_data = [tx.to_json() for tx in self.transaction_pool.transaction_map.values()]
-                await websocket.send(self.create_message(self.MSG_RESPONSE_TX_POOL, tx_pool_data))
+    async def _handle_response_chain_length(self, data, websocket, message):
+        if self.resolve_request(data, data.get("length") if isinstance(data, dict) else None):
+            return
+        peer_length = data
+        local_length = len(self.blockchain.chain)
+        if peer_length < local_length or self.syncing_chain:
+            return
+        if peer_length - local_length > self.chunk_size and len(self._reliable_peers) > 1:
+            # Far behind with several peers connected: fetch windows from all of them at once
+            self.syncing_chain = True
+            self.spawn(self.catch_up_with_peers())
+        else:
+            await self.send(websocket, self.create_message(self.MSG_REQUEST_BLOCKS, local_length))
+            self.syncing_chain = True
+
+    async def _handle_request_blocks(self, data, websocket, message):
+        if isinstance(data, dict) and "req_id" in data:
+            start_height = max(0, data.get("start_height", 0))
+            end_height = min(data.get("end_height", start_height), start_height + self.max_chunk_size, len(self.blockchain.chain))
+            blocks_data = [block.to_json() for block in self.blockchain.chain[start_height:end_height]]
+            await self.send(websocket, self.create_message(
+                self.MSG_RESPONSE_BLOCKS, {"req_id": data["req_id"], "blocks": blocks_data}
+            ))
+            return
+        start_height = data
+        if len(self.peer_nodes) == 1:
+            logger.info(f"Sending full blockchain to peer {websocket.remote_address}")
+            blocks_to_send = self.blockchain.chain[1:]
+        else:
+            end_height = min(start_height + self.chunk_size, len(self.blockchain.chain))
+            blocks_to_send = self.blockchain.chain[start_height:end_height]
+            logger.debug(f"Sending blocks {start_height} to {end_height-1} to peer {websocket.remote_address}")
+        # Each frame extends the receiver's chain in turn, so the range can go out in pieces
+        if blocks_to_send:
+            await self.send_blocks(websocket, blocks_to_send)
+        else:
+            await self.send(websocket, self.create_message(self.MSG_RESPONSE_BLOCKS, []))
 
-            elif msg_type == self.MSG_RESPONSE_TX_POOL:
-                if not self.tx_pool_syncing:
-                    logger.debug("Ignoring RESPONSE_TX_POOL as not syncing")
-                    return
-                added_count = 0
-                for tx_data in data:
+    async def _handle_response_blocks(self, data, websocket, message):
+        peer_uri = self.peer_uri(websocket)
+        if self.resolve_request(data, data.get("blocks", []) if isinstance(data, dict) else None):
+            return
+        received_blocks_data = data
+        if received_blocks_data:
+            try:
+                received_blocks = []
+                errors = await self.verify_blocks_transactions(received_blocks_data)
+                for block_data, error in zip(received_blocks_data, errors):
                     try:
-                        transaction = Transaction.from_json(tx_data)
-                        tx_id = transaction.id
-                        tx_time = transaction.input.get('timestamp', 0)
-                        existing_tx = self.transaction_pool.transaction_map.get(tx_id)
-                        if existing_tx:
-                            if tx_time > existing_tx.input['timestamp']:
-                                Transaction.is_valid(transaction)
-                                self.transaction_pool.set_transaction(transaction)
-                                added_count += 1
-                        elif tx_id not in self.processed_transactions:
-                            Transaction.is_valid(transaction)
-                            self.transaction_pool.set_transaction(transaction)
-                            self.processed_transactions.add(tx_id)
-                            added_count += 1
+                        if error is not None:
+                            raise ValueError(error)
+                        received_blocks.append(Block.from_json(block_data))
                     except Exception as e:
-                        logger.error(f"Failed to add or update transaction from peer: {e}")
-                logger.info(f"Added/updated {added_count} transactions to pool")
-                if added_count == 0:
-                    self.tx_pool_syncing = False
-                elif time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                    await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
+                        logger.warning(f"Skipping invalid block: {e}")
+                        continue
+                if received_blocks and received_blocks[0].height <= self.blockchain.current_height:
+                    logger.warning(f"Ignoring blocks with invalid height {received_blocks[0].height}")
+                    self.syncing_chain = False
+                    return
+                logger.debug(f"Received {len(received_blocks)} blocks, attempting to extend chain")
+                # verify_blocks_transactions has checked every transaction of the blocks kept
+                verified_tx_ids = frozenset(tx_json.get('id') for block in received_blocks for tx_json in block.data)
+                self.blockchain.try_extend(received_blocks, verified_tx_ids)
+                await self.persist_blocks(received_blocks)
+                self.transaction_pool.clear_blockchain_transactions(self.blockchain)
+                logger.info(f"Extended chain to {len(self.blockchain.chain)} blocks")
+                if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
+                    self.tx_pool_syncing = True
+                    await self.broadcast(self.tx_pool_request())
                     self.last_tx_pool_request = time.time()
+                self.update_peer_reliability(peer_uri, success=True)
+                self.adjust_chunk_size(success=True)
+            except Exception as e:
+                logger.error(f"Error adding received blocks: {e}")
+                self.update_peer_reliability(peer_uri, success=False)
+                self.adjust_chunk_size(success=False)
+        else:
+            logger.warning(f"No blocks received from {peer_uri}")
+            self.update_peer_reliability(peer_uri, success=False)
+            self.adjust_chunk_size(success=False)
+        self.syncing_chain = False
 
-            elif msg_type == self.MSG_PEER_LIST:
-                for peer_uri in data:
-                    if peer_uri != self.node_id and peer_uri != self.my_uri and peer_uri not in self.peer_nodes and peer_uri not in self.known_peers:
-                        self.known_peers.add(peer_uri)
-                        self.save_peers()
-                        asyncio.create_task(self.connect_to_peer(peer_uri))
-
-            elif msg_type == self.MSG_REQUEST_CHAIN_LENGTH:
-                await websocket.send(self.create_message(self.MSG_RESPONSE_CHAIN_LENGTH, len(self.blockchain.chain)))
-
-            elif msg_type == self.MSG_RESPONSE_CHAIN_LENGTH:
-                peer_length = data
-                local_length = len(self.blockchain.chain)
-                if peer_length >= local_length and not self.syncing_chain:
-                    await websocket.send(self.create_message(self.MSG_REQUEST_BLOCKS, local_length))
-                    self.syncing_chain = True
-
-            elif msg_type == self.MSG_REQUEST_BLOCKS:
-                start_height = data
-                if len(self.peer_nodes) == 1:
-                    logger.info(f"Sending full blockchain to peer {websocket.remote_address}")
-                    blocks_to_send = self.blockchain.chain[1:]
-                else:
-                    end_height = min(start_height + self.chunk_size, len(self.blockchain.chain))
-                    blocks_to_send = self.blockchain.chain[start_height:end_height]
-                    logger.debug(f"Sending blocks {start_height} to {end_height-1} to peer {websocket.remote_address}")
-                blocks_data = [block.to_json() for block in blocks_to_send]
-                await websocket.send(self.create_message(self.MSG_RESPONSE_BLOCKS, blocks_data))
-
-            elif msg_type == self.MSG_RESPONSE_BLOCKS:
-                received_blocks_data = data
-                if received_blocks_data:
-                    try:
-                        received_blocks = []
-                        for block_data in received_blocks_data:
-                            try:
-                                block = Block.from_json(block_data)
-                                for tx_json in block.data:
-                                    tx = Transaction.from_json(tx_json)
-                                    Transaction.is_valid(tx)
-                                received_blocks.append(block)
-                            except Exception as e:
-                                logger.warning(f"Skipping invalid block: {e}")
-                                continue
-                        potential_chain = self.blockchain.chain[:]
-                        if received_blocks and received_blocks[0].height <= self.blockchain.current_height:
-                            logger.warning(f"Ignoring blocks with invalid height {received_blocks[0].height}")
-                            self.syncing_chain = False
-                            return
-                        potential_chain += received_blocks
-                        logger.debug(f"Received {len(received_blocks)} blocks, attempting to replace chain")
-                        self.blockchain.utxo_set.clear()
-                        self.blockchain.replace_chain(potential_chain)
-                        for block in received_blocks:
-                            self.save_block_to_db(block)
-                        self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                        logger.info(f"Replaced chain with {len(potential_chain)} blocks")
-                        if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                            self.tx_pool_syncing = True
-                            await self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None))
-                            self.last_tx_pool_request = time.time()
-                        self.update_peer_reliability(peer_uri, success=True)
-                        self.adjust_chunk_size(success=True)
-                    except Exception as e:
-                        logger.error(f"Error adding received blocks: {e}")
-                        self.update_peer_reliability(peer_uri, success=False)
-                        self.adjust_chunk_size(success=False)
-                else:
-                    logger.warning(f"No blocks received from {peer_uri}")
-                    self.update_peer_reliability(peer_uri, success=False)
-                    self.adjust_chunk_size(success=False)
-                self.syncing_chain = False
-
-            elif msg_type == self.MSG_REQUEST_TX:
-                tx_id = data
-                tx = self.transaction_pool.transaction_map.get(tx_id)
-                if tx:
-                    await websocket.send(self.create_message(self.MSG_RESPONSE_TX, tx.to_json()))
-                    logger.info(f"Sent transaction {tx_id} to peer")
-                else:
-                    logger.warning(f"Requested transaction {tx_id} not found in pool")
+    async def _handle_batch(self, data, websocket, message):
+        for frame in data:
+            await self.handle_message(frame, websocket, in_batch=True)
 
-            elif msg_type == self.MSG_RESPONSE_TX:
-                try:
-                    transaction = Transaction.from_json(data)
-                    tx_id = transaction.id
-                    Transaction.is_valid(transaction)
-                    self.transaction_pool.set_transaction(transaction)
-                    self.processed_transactions.add(tx_id)
-                    logger.info(f"Added transaction {tx_id} from peer")
-                except Exception as e:
-                    logger.error(f"Failed to process received transaction {data.get('id', 'unknown')}: {e}")
+    async def _handle_request_tx(self, data, websocket, message):
+        for tx_id in (data if isinstance(data, list) else [data]):
+            tx = self.transaction_pool.transaction_map.get(tx_id)
+            if tx:
+                await self.send(websocket, self.create_message(self.MSG_RESPONSE_TX, tx.to_json()))
+                logger.info(f"Sent transaction {tx_id} to peer")
+            else:
+                logger.warning(f"Requested transaction {tx_id} not found in pool")
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON message received: {message}")
+    async def _handle_response_tx(self, data, websocket, message):
+        try:
+            transaction = Transaction.from_json(data)
+            tx_id = transaction.id
+            Transaction.is_valid(transaction)
+            self.transaction_pool.set_transaction(transaction)
+            self.mark_processed(tx_id)
+            logger.info(f"Added transaction {tx_id} from peer")
         except Exception as e:
-            logger.error(f"Error handling message: {e}")
+            logger.error(f"Failed to process received transaction {data.get('id', 'unknown')}: {e}")
 
     async def broadcast(self, message, exclude=None):
         logger.info(f"Broadcasting to {len(self.peer_nodes)} direct peers and {len(self.relay_peers)} relay peers")
         failed_peers = []
         relay_needed = []
 
-        # Try direct communication
+        # Direct peers: hand the frame to each peer's writer without waiting on the network
         for uri, peer in list(self.peer_nodes.items()):
             if peer != exclude:
-                try:
-                    await peer.send(message)
-                    logger.debug(f"Sent message to peer {uri}")
-                    self.update_peer_reliability(uri, success=True)
-                except ConnectionClosedError:
-                    logger.warning(f"Connection closed by peer {uri}, marking for relay")
-                    relay_needed.append(uri)
-                except Exception as e:
-                    logger.error(f"Failed to send to {uri}: {e}, will try relay")
+                queue = self.peer_send_queues.get(uri)
+                if queue is None:
+                    logger.warning(f"Connection to peer {uri} is gone, marking for relay")
                     relay_needed.append(uri)
-
-        # Handle relay peers
-        for uri in list(self.relay_peers.keys()) + relay_needed:
-            if uri != self.my_uri and (exclude is None or uri != exclude.remote_address[1]):
-                if await self.relay_message(uri, message):
-                    logger.debug(f"Successfully relayed message to {uri}")
+                    continue
+                # A peer that falls behind loses its oldest gossip, which it can sync
+                # later, instead of holding gossip back for everyone else
+                overflowed = False
+                while queue.full() and queue.shed_gossip():
+                    overflowed = True
+                try:
+                    queue.put_nowait((message, True))
+                    logger.debug(f"Queued message for peer {uri}")
+                except asyncio.QueueFull:
+                    # Only frames queued by send are waiting, such as blocks being streamed
+                    # to this peer; skip this gossip without counting it against the peer
+                    logger.debug(f"Peer {uri} is busy with queued responses, skipped gossip")
+                    continue
+                if not overflowed:
+                    self._peer_overflows.pop(uri, None)
                     self.update_peer_reliability(uri, success=True)
-                else:
-                    logger.error(f"Failed to relay message to {uri}")
+                    continue
+                overflows = self._peer_overflows.get(uri, 0) + 1
+                self._peer_overflows[uri] = overflows
+                if overflows >= self.max_peer_overflows:
+                    logger.warning(f"Peer {uri} has {queue.qsize()} frames ({queue.queued_bytes} bytes) backed up, disconnecting")
                     failed_peers.append(uri)
                     self.update_peer_reliability(uri, success=False)
+                else:
+                    logger.debug(f"Peer {uri} is backed up, dropped its oldest gossip")
+
+        # Handle relay peers
+        relay_targets = [
+            uri for uri in dict.fromkeys(list(self.relay_peers.keys()) + relay_needed)
+            if uri != self.my_uri and (exclude is None or uri != exclude.remote_address[1])
+        ]
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self.relay_message(uri, message), self.send_timeout) for uri in relay_targets),
+            return_exceptions=True
+        )
+        for uri, relayed in zip(relay_targets, results):
+            if relayed is True:
+                logger.debug(f"Successfully relayed message to {uri}")
+                self.update_peer_reliability(uri, success=True)
+            else:
+                logger.error(f"Failed to relay message to {uri}")
+                failed_peers.append(uri)
+                self.update_peer_reliability(uri, success=False)
 
         # Clean up failed peers
         for uri in failed_peers:
@@ -647,7 +1515,7 @@ class PubSub:
         not self.tx_pool_syncing and \
         time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
             self.tx_pool_syncing = True
-            asyncio.create_task(self.broadcast(self.create_message(self.MSG_REQUEST_TX_POOL, None)))
+            self.spawn(self.broadcast(self.tx_pool_request()))
             self.last_tx_pool_request = time.time()
 
     async def handle_relay_responses(self, boot_ws, target_uri):
@@ -660,7 +1528,7 @@ class PubSub:
                     if isinstance(response, bytes):
                         msg = self.decompress_data(response)
                     else:
-                        msg = json.loads(response)
+                        msg = orjson.loads(response)
                     msg_type = msg.get('type')
                     logger.info(f"Received relayed message from boot node for {target_uri}: {msg_type}")
 
@@ -689,7 +1557,7 @@ class PubSub:
                     # Pass the raw response to handle_message to ensure proper parsing
                     await self.handle_message(self.compress_data(msg) if isinstance(response, bytes) else response, ws_wrapper)
 
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     logger.error(f"Invalid JSON response from boot node for {target_uri}: {e}")
                 except Exception as e:
                     logger.error(f"Error handling relay response for {target_uri}: {e}")
@@ -725,7 +1593,8 @@ class PubSub:
                 "type": "RELAY_MESSAGE",
                 "data": {
                     "target_uri": target_uri,
-                    "data": base64.b64encode(message).decode('utf-8')
+                    # The target's codec support is unknown, so relayed frames are always JSON
+                    "data": base64.b64encode(to_json_frame(message)).decode('utf-8')
                 },
                 "from": self.my_uri  # Use my_uri instead of node_id for consistency
             }
@@ -744,6 +1613,47 @@ class PubSub:
                 del self.relay_peers[target_uri]
             return False
 
+    def tune_socket(self, websocket):
+        """Enlarge the kernel buffers of a peer connection so multi-MB chain frames are
+        not written in many small drains. TCP_NODELAY is already set by the event loop."""
+        transport = getattr(websocket, 'transport', None)
+        sock = transport.get_extra_info('socket') if transport is not None else None
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.socket_buffer_size)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.socket_buffer_size)
+        except OSError as e:
+            logger.debug(f"Could not resize socket buffers: {e}")
+
+    def set_cork(self, websocket, on):
+        """Set or clear TCP_CORK on a peer connection, so frames written back to back
+        go out in full segments. Linux only; returns whether the option was applied."""
+        if not hasattr(socket, 'TCP_CORK'):
+            return False
+        transport = getattr(websocket, 'transport', None)
+        sock = transport.get_extra_info('socket') if transport is not None else None
+        if sock is None:
+            return False
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1 if on else 0)
+            return True
+        except OSError as e:
+            logger.debug(f"Could not set TCP_CORK: {e}")
+            return False
+
+    def add_peer(self, uri, websocket):
+        self.tune_socket(websocket)
+        writer = self._peer_writers.pop(uri, None)
+        if writer is not None:
+            writer.cancel()
+        self.peer_nodes[uri] = websocket
+        queue = FrameQueue(maxsize=self.peer_queue_size, max_bytes=self.peer_queue_bytes)
+        self.peer_send_queues[uri] = queue
+        self._peer_writers[uri] = asyncio.create_task(self._peer_writer(uri, websocket, queue))
+        if self.peer_reliability.get(uri, 0) < self.max_peer_failures:
+            self._reliable_peers.add(uri)
+
     async def remove_peer(self, uri):
         if uri in self.peer_nodes:
             try:
@@ -751,19 +1661,25 @@ class PubSub:
             except:
                 pass
             del self.peer_nodes[uri]
+            self.peer_send_queues.pop(uri, None)
+            self._peer_overflows.pop(uri, None)
+            writer = self._peer_writers.pop(uri, None)
+            if writer is not None:
+                writer.cancel()
+            self._reliable_peers.discard(uri)
             self.known_peers.discard(uri)
-            self.save_peers()
+            self.forget_peer(uri)
             logger.info(f"Peer {uri} removed from known peers")
 
     async def connection_handler(self, websocket):
         try:
-            peer_uri = f"ws://{websocket.remote_address[0]}:{websocket.remote_address[1]}"
-            self.peer_nodes[peer_uri] = websocket
+            peer_uri = self.peer_uri(websocket)
+            self.add_peer(peer_uri, websocket)
             logger.info(f"New peer connected: {peer_uri}")
-            await websocket.send(self.create_message(self.MSG_REQUEST_CHAIN_LENGTH, None))
+            await self.send(websocket, self.create_message(self.MSG_REQUEST_CHAIN_LENGTH, None))
             if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
                 self.tx_pool_syncing = True
-                await websocket.send(self.create_message(self.MSG_REQUEST_TX_POOL, None))
+                await self.send(websocket, self.tx_pool_request())
                 self.last_tx_pool_request = time.time()
             async for message in websocket:
                 await self.handle_message(message, websocket)
@@ -774,45 +1690,53 @@ class PubSub:
             logger.error(f"Error in connection handler for {peer_uri}: {e}")
             await self.remove_peer(peer_uri)
 
-    async def connect_to_peer(self, uri, retries=0):
-        if uri == self.my_uri or uri in self.peer_nodes or retries >= self.max_retries -1:
-            if uri == self.my_uri:
-                logger.info(f"Skipping connection to self: {uri}")
+    def retry_delay(self, attempt, base):
+        """Exponential backoff capped at max_retry_delay, with up to a second of jitter so
+        peers that failed together do not all retry together."""
+        return min(self.max_retry_delay, base * 2 ** attempt) + random.random()
+
+    async def connect_to_peer(self, uri):
+        if uri == self.my_uri:
+            logger.info(f"Skipping connection to self: {uri}")
+            return
+
+        for attempt in range(self.max_retries):
+            if uri in self.peer_nodes:
                 return
-            if retries >= self.max_retries:
-                logger.info(f"Max retries reached for peer {uri}, switching to relay mode")
-                if await self.ensure_relay_connection(uri):
-                    # Send initial messages via relay
-                    await self.relay_message(uri, self.create_message(self.MSG_REQUEST_CHAIN_LENGTH, None))
+            try:
+                logger.info(f"Connecting to peer {uri} (attempt {attempt + 1}/{self.max_retries})")
+                # Only the handshake is bounded; an open connection does not hold a slot
+                async with self._handshake_slots:
+                    websocket = await websockets.connect(uri, **self.peer_ws_options)
+                try:
+                    self.add_peer(uri, websocket)
+                    logger.info(f"Connected to peer {uri}")
+                    await self.send(websocket, self.create_message(self.MSG_REQUEST_CHAIN_LENGTH, None))
                     if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
                         self.tx_pool_syncing = True
-                        await self.relay_message(uri, self.create_message(self.MSG_REQUEST_TX_POOL, None))
+                        await self.send(websocket, self.tx_pool_request())
                         self.last_tx_pool_request = time.time()
-                    # Schedule chain sync retry if needed
-                    # asyncio.create_task(self.retry_chain_sync(uri))
+                    async for message in websocket:
+                        await self.handle_message(message, websocket)
+                finally:
+                    await websocket.close()
                 return
+            except Exception as e:
+                logger.error(f"Failed to connect to peer {uri}: {e}")
+                if attempt + 1 < self.max_retries:
+                    await asyncio.sleep(self.retry_delay(attempt, 2))
+
+        logger.info(f"Max retries reached for peer {uri}, switching to relay mode")
+        if await self.ensure_relay_connection(uri):
+            # Send initial messages via relay
+            await self.relay_message(uri, self.create_message(self.MSG_REQUEST_CHAIN_LENGTH, None))
+            if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
+                self.tx_pool_syncing = True
+                await self.relay_message(uri, self.tx_pool_request())
+                self.last_tx_pool_request = time.time()
+            # Schedule chain sync retry if needed
+            # asyncio.create_task(self.retry_chain_sync(uri))
 
-        parsed_uri = uri
-        try:
-            logger.info(f"Connecting to peer {uri} via {parsed_uri} (retry {retries + 1}/{self.max_retries})")
-            async with websockets.connect(parsed_uri, ping_interval=30, ping_timeout=60, max_size=1024*1024) as websocket:
-                self.peer_nodes[uri] = websocket
-                logger.info(f"Connected to peer {uri} via {parsed_uri}")
-                await websocket.send(self.create_message(self.MSG_REQUEST_CHAIN_LENGTH, None))
-                if not self.tx_pool_syncing and time.time() - self.last_tx_pool_request > self.tx_pool_request_cooldown:
-                    self.tx_pool_syncing = True
-                    await websocket.send(self.create_message(self.MSG_REQUEST_TX_POOL, None))
-                    self.last_tx_pool_request = time.time()
-                async for message in websocket:
-                    await self.handle_message(message, websocket)
-        except Exception as e:
-            logger.error(f"Failed to connect to peer {uri} via {parsed_uri}: {e}")
-            if retries + 1 < self.max_retries:
-                await asyncio.sleep(2 * (2 ** retries))
-                await self.connect_to_peer(uri, retries + 1)
-            else:
-                await self.connect_to_peer(uri, retries=self.max_retries)
-    
     async def ensure_relay_connection(self, target_uri):
         """Ensure a relay connection exists for the target URI."""
         if target_uri in self.relay_peers and self.relay_peers[target_uri].closed:
@@ -829,45 +1753,45 @@ class PubSub:
                 self.relay_peers[target_uri] = boot_ws
                 logger.info(f"Established relay connection to {target_uri} via boot node")
                 # Register with boot node to ensure it knows our URI
-                await boot_ws.send(self.create_message(self.MSG_REGISTER_PEER, self.my_uri))
+                await boot_ws.send(self.create_message(self.MSG_REGISTER_PEER, self.my_uri, binary=False))
                 # Start handling responses for this relay connection
-                asyncio.create_task(self.handle_relay_responses(boot_ws, target_uri))
+                self.spawn(self.handle_relay_responses(boot_ws, target_uri))
                 return True
             except Exception as e:
                 logger.error(f"Failed to establish relay connection for {target_uri}: {e}")
                 return False
         return True
 
-    async def register_with_boot_node(self, uri, my_uri, retries=0):
-        if retries >= self.max_retries:
-            logger.error(f"Max retries reached for boot node {uri}. Unable to register.")
-            return
-        try:
-            public_ip, public_port = await self.get_public_ip_port()
-            if public_ip and public_port:
-                my_uri = f"ws://{public_ip}:{public_port}"
-                logger.info(f"Updated my_uri with STUN/TURN: {my_uri}")
-            else:
-                logger.warning(f"Using original my_uri: {my_uri}")
-
-            logger.info(f"Connecting to boot node {uri} (retry {retries + 1}/{self.max_retries})")
-            async with websockets.connect(uri, ping_interval=30, ping_timeout=60, max_size=1024*1024) as websocket:
-                logger.info(f"Connected to boot node {uri}")
-                await websocket.send(self.create_message(self.MSG_REGISTER_PEER, my_uri))
-                async for message in websocket:
-                    msg = self.parse_message(message)
-                    if msg['type'] == self.MSG_PEER_LIST:
-                        peers = msg['data'] if msg.get('data') else []
-                        logger.info(f"Received peer list from boot node ..: {peers}")
-                        valid_peers = [p for p in peers if p.startswith('ws://') and p != my_uri]
-                        self.known_peers.update(valid_peers)
-                        self.save_peers()
-                        for peer_uri in valid_peers:
-                            asyncio.create_task(self.connect_to_peer(peer_uri))
-        except Exception as e:
-            logger.error(f"Failed to connect to boot node {uri}: {e}")
-            await asyncio.sleep(5 * (2 ** retries))
-            await self.register_with_boot_node(uri, my_uri, retries + 1)
+    async def register_with_boot_node(self, uri, my_uri):
+        for attempt in range(self.max_retries):
+            try:
+                public_ip, public_port = await self.get_public_ip_port()
+                if public_ip and public_port:
+                    my_uri = f"ws://{public_ip}:{public_port}"
+                    logger.info(f"Updated my_uri with STUN/TURN: {my_uri}")
+                else:
+                    logger.warning(f"Using original my_uri: {my_uri}")
+
+                logger.info(f"Connecting to boot node {uri} (attempt {attempt + 1}/{self.max_retries})")
+                async with websockets.connect(uri, ping_interval=30, ping_timeout=60, max_size=1024*1024) as websocket:
+                    logger.info(f"Connected to boot node {uri}")
+                    await websocket.send(self.create_message(self.MSG_REGISTER_PEER, my_uri, binary=False))
+                    async for message in websocket:
+                        msg = self.parse_message(message)
+                        if msg['type'] == self.MSG_PEER_LIST:
+                            peers = msg['data'] if msg.get('data') else []
+                            logger.info(f"Received peer list from boot node ..: {peers}")
+                            valid_peers = [p for p in peers if p.startswith('ws://') and p != my_uri]
+                            self.known_peers.update(valid_peers)
+                            self.save_peers(valid_peers)
+                            for peer_uri in valid_peers:
+                                self.spawn(self.connect_to_peer(peer_uri))
+                return
+            except Exception as e:
+                logger.error(f"Failed to connect to boot node {uri}: {e}")
+                if attempt + 1 < self.max_retries:
+                    await asyncio.sleep(self.retry_delay(attempt, 5))
+        logger.error(f"Max retries reached for boot node {uri}. Unable to register.")
 
     async def start_server(self):
         try:
@@ -875,48 +1799,109 @@ class PubSub:
         except Exception as e:
             logger.error(f"Failed to open port {self.websocket_port} via UPnP: {e}. Please forward manually.")
         await self.initialize_async()
-        self.server = await websockets.serve(self.connection_handler, "0.0.0.0", self.websocket_port, max_size=1024*1024)
+        self.server = await websockets.serve(self.connection_handler, "0.0.0.0", self.websocket_port, **self.peer_ws_options)
         logger.info(f"Peer node running at {self.my_uri}")
         await self.sync_with_peers()
         return self.server
 
     async def broadcast_transaction(self, transaction):
-        message = self.create_message(self.MSG_NEW_TX, transaction.to_json())
-        await self.broadcast(message)
+        message = self.gossip_message(
+            self.MSG_NEW_TX, (transaction.id, transaction.input.get('timestamp', 0)), transaction.to_json()
+        )
+        await self.gossip_transaction(message)
+
+    async def gossip_transaction(self, frame, exclude=None):
+        """Queue a NEW_TX frame for the next flush instead of broadcasting it on its own.
+        A flush hands every queued frame to the peer writers in one go, so writers for
+        msgpack peers send them as a single BATCH message."""
+        self._tx_outbox.append((frame, exclude))
+        if len(self._tx_outbox) >= self.tx_flush_size:
+            await self.flush_tx_outbox()
+        elif self._tx_flush_task is None:
+            self._tx_flush_task = asyncio.create_task(self._flush_tx_outbox_later())
+
+    async def _flush_tx_outbox_later(self):
+        try:
+            await asyncio.sleep(self.tx_flush_interval)
+        finally:
+            self._tx_flush_task = None
+        await self.flush_tx_outbox()
+
+    async def flush_tx_outbox(self):
+        outbox, self._tx_outbox = self._tx_outbox, []
+        for frame, exclude in outbox:
+            try:
+                await self.broadcast(frame, exclude=exclude)
+            except Exception as e:
+                logger.error(f"Failed to broadcast transaction: {e}")
+
+    def _enqueue_broadcast(self, broadcast, *args):
+        """Run on the P2P loop: start a broadcast coroutine and keep it referenced until done."""
+        self.spawn(broadcast(*args))
+
+    def spawn(self, coro):
+        """Start coro as a task and keep a reference to it until it finishes; the event
+        loop only holds weak references, so an unreferenced task can vanish mid-run."""
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
 
     def broadcast_transaction_sync(self, transaction):
+        """Schedule a broadcast from any thread; returns without waiting for it."""
         if self.loop:
-            future = asyncio.run_coroutine_threadsafe(self.broadcast_transaction(transaction), self.loop)
-            future.result()
-            logger.info(f"Broadcasted transaction {transaction.id}")
+            self.loop.call_soon_threadsafe(self._enqueue_broadcast, self.broadcast_transaction, transaction)
+            logger.info(f"Queued broadcast of transaction {transaction.id}")
         else:
             logger.error("Event loop not available for broadcasting")
 
     async def broadcast_block(self, block):
-        message = self.create_message(self.MSG_NEW_BLOCK, block.to_json())
+        if len(block.data) >= self.offload_block_txs and (self.MSG_NEW_BLOCK, block.hash) not in self._broadcast_cache:
+            # Serializing and compressing a large block would stall every peer's receive loop
+            frame = await asyncio.to_thread(lambda: self.create_message(self.MSG_NEW_BLOCK, block.to_json()))
+            self.cache_gossip_frame(self.MSG_NEW_BLOCK, block.hash, frame)
+        message = self.gossip_message(self.MSG_NEW_BLOCK, block.hash, block.to_json())
         await self.broadcast(message)
 
     def broadcast_block_sync(self, block):
+        """Schedule a broadcast from any thread; returns without waiting for it."""
         if self.loop:
-            future = asyncio.run_coroutine_threadsafe(self.broadcast_block(block), self.loop)
-            future.result()
-            logger.info(f"Broadcasted block {block.hash}")
+            self.loop.call_soon_threadsafe(self._enqueue_broadcast, self.broadcast_block, block)
+            logger.info(f"Queued broadcast of block {block.hash}")
         else:
             logger.error("Event loop not available for broadcasting")
 
     async def run_peer_discovery(self):
         logger.info("Starting peer discovery...")
         if self.my_uri != self.boot_node_uri:
-            asyncio.create_task(self.register_with_boot_node(self.boot_node_uri, self.my_uri))
+            self.spawn(self.register_with_boot_node(self.boot_node_uri, self.my_uri))
         known_peers = self.load_peers()
+        self.known_peers.update(known_peers)
+        # Each connection lives in its own task; connect_to_peer limits how many
+        # handshakes are in flight, so a long peers list does not open them all at once
         for peer_uri in known_peers:
             if peer_uri != self.my_uri and peer_uri != self.node_id:
-                asyncio.create_task(self.connect_to_peer(peer_uri))
+                self.spawn(self.connect_to_peer(peer_uri))
 
     def start_websocket_server(self):
+        """Run the node on a loop of its own in the calling thread until it is interrupted
+        or stop_websocket_server is called."""
         async def run_node():
-            await self.start_server()
-            await self.run_peer_discovery()
-
-        self.loop = asyncio.get_event_loop()
-        self.loop.run_until_complete(run_node())
\ No newline at end of file
+            self._stop_event = asyncio.Event()
+            try:
+                await self.start_server()
+                await self.run_peer_discovery()
+                await self._stop_event.wait()
+            finally:
+                await self.close()
+
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop is not None else None) as runner:
+            # Set before the node starts so broadcast_*_sync can reach it from other threads
+            self.loop = runner.get_loop()
+            runner.run(run_node())
+
+    def stop_websocket_server(self):
+        """Make start_websocket_server close the node and return. Safe to call from
+        other threads and from signal handlers."""
+        if self.loop is not None and self._stop_event is not None:
+            self.loop.call_soon_threadsafe(self._stop_event.set)
\ No newline at end of file
@@ -0,0 +1,71 @@
+import gzip
+import msgpack
+import orjson
+import threading
+import zstandard
+
+# Every P2P frame is a one-byte codec tag followed by the body, so a receiver
+# knows how to decode it without a handshake. The tag is a set of flags: the body
+# is JSON unless CODEC_MSGPACK is set, and zstd-compressed if CODEC_ZSTD is set.
+# Frames that start with the gzip magic come from nodes that predate the tag and
+# are still accepted.
+CODEC_RAW = 0x00
+CODEC_ZSTD = 0x01
+CODEC_MSGPACK = 0x02
+GZIP_MAGIC = b'\x1f\x8b'
+
+ZSTD_LEVEL = 1
+# Below this many bytes the zstd frame header costs more than compression saves
+COMPRESS_MIN_SIZE = 512
+
+# zstd contexts are reusable but not thread-safe, so each thread keeps its own
+_local = threading.local()
+
+def _compressor():
+    cctx = getattr(_local, 'cctx', None)
+    if cctx is None:
+        cctx = _local.cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return cctx
+
+def _decompressor():
+    dctx = getattr(_local, 'dctx', None)
+    if dctx is None:
+        dctx = _local.dctx = zstandard.ZstdDecompressor()
+    return dctx
+
+def encode_payload(raw, compress=True, flags=CODEC_RAW):
+    if compress and len(raw) >= COMPRESS_MIN_SIZE:
+        return bytes((flags | CODEC_ZSTD,)) + _compressor().compress(raw)
+    return bytes((flags,)) + raw
+
+def encode_body(data, binary=False):
+    if binary:
+        return msgpack.packb(data, use_bin_type=True)
+    return orjson.dumps(data)
+
+def encode_message(data, compress=True, binary=False):
+    return encode_payload(encode_body(data, binary), compress, CODEC_MSGPACK if binary else CODEC_RAW)
+
+def decode_message(frame):
+    if frame[:2] == GZIP_MAGIC:
+        return orjson.loads(gzip.decompress(frame))
+    if not frame:
+        raise ValueError("Empty message")
+    tag = frame[0]
+    if tag & ~(CODEC_ZSTD | CODEC_MSGPACK):
+        raise ValueError(f"Unknown codec tag {tag}")
+    body = memoryview(frame)[1:]
+    if tag & CODEC_ZSTD:
+        body = _decompressor().decompress(body)
+    if tag & CODEC_MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    return orjson.loads(body)
+
+def is_binary(frame):
+    return bool(frame) and frame[:2] != GZIP_MAGIC and bool(frame[0] & CODEC_MSGPACK)
+
+def to_json_frame(frame):
+    """Re-encode a MessagePack frame as JSON for a peer that did not negotiate msgpack."""
+    if not is_binary(frame):
+        return frame
+    return encode_message(decode_message(frame))
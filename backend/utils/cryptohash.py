@@ -5,3 +5,12 @@ def crypto_hash(*args):
     stringified_args = sorted(map(lambda arg: json.dumps(arg, sort_keys=True, separators=(',', ':'), default=str), args))
     joined_data = ''.join(stringified_args)
     return hashlib.sha256(joined_data.encode('utf-8')).hexdigest()
+
+def crypto_hash_pair(left, right):
+    """Same digest as crypto_hash(left + right) for two hex digests, fed to one
+    hash object instead of building and JSON-encoding the joined string."""
+    h = hashlib.sha256(b'"')
+    h.update(left.encode('ascii'))
+    h.update(right.encode('ascii'))
+    h.update(b'"')
+    return h.hexdigest()